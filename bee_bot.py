@@ -5,6 +5,7 @@
 import os
 import discord
 import itertools
+import cogs.helper.api.riot_api as riot_api
 
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
@@ -41,8 +42,15 @@ DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 intents = discord.Intents.default()
 intents.members = True
 
+class BeeBot(commands.Bot):
+    async def close(self):
+        await super().close()
+        # the pooled riot api / data dragon session is shared by every cog, it's closed once with the bot
+        await riot_api.close_session()
+
+
 # bot setup
-bot = commands.Bot(command_prefix=get_prefix, description='🐝 Hello! I am BeeBot! 🐝',
+bot = BeeBot(command_prefix=get_prefix, description='🐝 Hello! I am BeeBot! 🐝',
                    case_insensitive=True, intents=intents, help_command=PrettyHelp())
 
 # load extensions(cogs) listed above in [all_extensions].
@@ -81,4 +89,6 @@ async def change_activity():
     await bot.change_presence(activity=discord.Game(next(statuslist)))
 
 
-bot.run(DISCORD_TOKEN, bot=True, reconnect=True)
+# spawned worker processes (ytdl_workers) import this file too, only the real bot process connects
+if __name__ == '__main__':
+    bot.run(DISCORD_TOKEN, bot=True, reconnect=True)
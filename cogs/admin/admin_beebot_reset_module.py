@@ -40,13 +40,13 @@ class admin_beebot_reset_module(commands.Cog, name="Admin_BeeBot_Reset_Module",
         if event == None:
             return await ctx.send('Please add an event to reset!')
         if event.lower() == 'all':
-            events.set_events_json({})
+            async with events.transaction() as events_json:
+                events_json.clear()
             return await ctx.send('Reset ALL BeeBot events file.')
-        events_json = events.get_events_json()
-        if not event.lower() in events_json:
+        if not event.lower() in events.get_events_json():
             return await ctx.send('Your event doesn\'t exist!')
-        events_json[event] = {}
-        events.set_events_json(events_json)
+        async with events.transaction((event,)) as events_json:
+            events_json[event] = {}
         await ctx.send(f'Reset {event} BeeBot events file.')
 
     # *********************************************************************************************************************
@@ -56,7 +56,8 @@ class admin_beebot_reset_module(commands.Cog, name="Admin_BeeBot_Reset_Module",
     # only specific roles can use this command
     @commands.has_role(admin_specific_command_name)
     async def admin_beebot_reset_all_beebot_profiles(self, ctx):
-        beebot_profiles.set_beebot_profiles_json({})
+        async with beebot_profiles.transaction() as beebot_profiles_data:
+            beebot_profiles_data.clear()
         await ctx.send('Reset BeeBot profiles file.')
 
     # *********************************************************************************************************************
@@ -32,26 +32,30 @@ class test_module(commands.Cog, name="Test_Module",
     # only specific roles can use this command
     @commands.has_role(admin_specific_command_name)
     async def image_test(self, ctx, champ1, champ2):
-        # get current lol version for region
-        champions_version = lol_api.get_version()['n']['champion']
-        champ_list = lol_api.get_champion_list(champions_version)['data']
+        # get current lol champion catalog for region
+        catalog = await lol_api.get_catalog()
+        champions_version = catalog.version
 
-        lol_champion1 = lol_api.champion_string_formatting(champ1)
-        lol_champion2 = lol_api.champion_string_formatting(champ2)
+        champion_record1 = catalog.find_champion(champ1)
+        champion_record2 = catalog.find_champion(champ2)
+        if champion_record1 is None or champion_record2 is None:
+            return await ctx.send("Sorry! An error has occurred! :cry: Check your spelling and try again! :slight_smile:")
+        lol_champion1 = champion_record1['id']
+        lol_champion2 = champion_record2['id']
 
         image1_url = f'http://ddragon.leagueoflegends.com/cdn/{champions_version}/img/champion/{lol_champion1}.png'
         image2_url = f'http://ddragon.leagueoflegends.com/cdn/{champions_version}/img/champion/{lol_champion2}.png'
 
-        image1 = images.get_image_by_url(image1_url)
-        image2 = images.get_image_by_url(image2_url)
+        image1 = await images.get_resized_image(image1_url)
+        image2 = await images.get_resized_image(image2_url)
 
-        images.merge_images_width_wise(image1, image2, images.get_image_path(
+        await images.merge_images_width_wise_async(image1, image2, images.get_image_path(
             'riot_images/spectator/new_image.png'))
 
         image1 = images.new_blank_image()
-        image2 = images.get_image_by_url(image2_url)
+        image2 = await images.get_resized_image(image2_url)
 
-        images.merge_images_width_wise(image1, image2, images.get_image_path(
+        await images.merge_images_width_wise_async(image1, image2, images.get_image_path(
             'riot_images/spectator/new_image2.png'))
 
         await ctx.send("images")
@@ -44,14 +44,13 @@ class beebotprofilemodule(commands.Cog, name="BeeBotProfileModule", description=
                 roles_list.append(role.lower())
         roles_list = list(dict.fromkeys(roles_list))
         profile = str(ctx.message.author)
-        beebot_profiles_data = beebot_profiles.get_beebot_profiles_json()
-        beebot_profiles_data = beebot_profiles.beebot_profile_exists(
-            beebot_profiles_data, profile)
-        beebot_profiles_data = beebot_profiles.beebot_profile_key_exists(
-            beebot_profiles_data, profile, "league_of_legends")
-        beebot_profiles_data[profile]["league_of_legends"][
-            'preferred_role(s)'] = roles_list
-        beebot_profiles.set_beebot_profiles_json(beebot_profiles_data)
+        async with beebot_profiles.transaction(profile) as beebot_profiles_data:
+            beebot_profiles_data = beebot_profiles.beebot_profile_exists(
+                beebot_profiles_data, profile)
+            beebot_profiles_data = beebot_profiles.beebot_profile_key_exists(
+                beebot_profiles_data, profile, "league_of_legends")
+            beebot_profiles_data[profile]["league_of_legends"][
+                'preferred_role(s)'] = roles_list
         await ctx.send("Your role(s) have been updated! :white_check_mark:")
 
     # *********************************************************************************************************************
@@ -68,11 +67,10 @@ class beebotprofilemodule(commands.Cog, name="BeeBotProfileModule", description=
         elif timezone not in timezones.list_all_timezones():
             return await ctx.send("Sorry! You need to add a valid timezone! :open_mouth:")
         profile = str(ctx.message.author)
-        beebot_profiles_data = beebot_profiles.get_beebot_profiles_json()
-        beebot_profiles_data = beebot_profiles.beebot_profile_exists(
-            beebot_profiles_data, profile)
-        beebot_profiles_data[profile]["timezone"] = timezone
-        beebot_profiles.set_beebot_profiles_json(beebot_profiles_data)
+        async with beebot_profiles.transaction(profile) as beebot_profiles_data:
+            beebot_profiles_data = beebot_profiles.beebot_profile_exists(
+                beebot_profiles_data, profile)
+            beebot_profiles_data[profile]["timezone"] = timezone
         await ctx.send("Your timezone has been updated! :white_check_mark:")
 
 
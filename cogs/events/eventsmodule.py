@@ -81,9 +81,10 @@ class eventsmodule(commands.Cog, name="EventsModule", description="activegiveawa
             return await ctx.send("Sorry! There are no active giveaways at the moment! :open_mouth:")
         if not events_data['giveaways']:
             return await ctx.send("Sorry! There are no active giveaways at the moment! :open_mouth:")
-        for giveaway in events_data['giveaways']:
+        # the document is live, giveaways can be created/ended while this awaits discord, so loop over a snapshot
+        for giveaway, details in list(events_data['giveaways'].items()):
             message = await ctx.fetch_message(int(giveaway))
-            await message.reply(f"**{events_data['giveaways'][giveaway]['title']}** run by **{events_data['giveaways'][giveaway]['giveaway_author_display_name']}**")
+            await message.reply(f"**{details['title']}** run by **{details['giveaway_author_display_name']}**")
 
     # *********************************************************************************************************************
     # bot command to make a giveaway in chat
@@ -99,13 +100,13 @@ class eventsmodule(commands.Cog, name="EventsModule", description="activegiveawa
                               rewards: Optional[str], *, description: Optional[str]):
         if title == None:
             return await ctx.send("Sorry! You forgot to add inputs! :open_mouth: Please provide some! :slight_smile:")
+        # accept aliases as well (ex: :tada:)
+        if reaction != None and not emojis.check_emoji(reaction):
+            reaction = emojis.resolve_alias(reaction) or reaction
         if reaction == None or not emojis.check_emoji(reaction):
             return await ctx.send("Sorry! You have an invalid emoji! :cry: Please try again! :smile:")
         if rewards == None:
             return await ctx.send("Sorry! You have invalid rewards! :cry: Please try again! :smile:")
-        events_data = events.get_events_json()
-        if not events.check_event(events_data, 'giveaways'):
-            events_data['giveaways'] = {}
         rewards = rewards.strip("]['").split("', '")
         giveaway_json = {'giveaway_author': str(ctx.message.author),
                          'giveaway_author_display_name': str(ctx.message.author.display_name),
@@ -138,8 +139,11 @@ class eventsmodule(commands.Cog, name="EventsModule", description="activegiveawa
         msg = await ctx.send(embed=embed)
         await msg.add_reaction(reaction)
         giveaway_json['message_id'] = int(msg.id)
-        events_data['giveaways'][int(msg.id)] = giveaway_json
-        events.set_events_json(events_data)
+        async with events.transaction(events.giveaway_key(msg.id)) as events_data:
+            if not events.check_event(events_data, 'giveaways'):
+                events_data['giveaways'] = {}
+            # keyed by str, the same as after a json round trip
+            events_data['giveaways'][str(msg.id)] = giveaway_json
 
     # *********************************************************************************************************************
     # bot command to end a giveaway in chat
@@ -153,7 +157,7 @@ class eventsmodule(commands.Cog, name="EventsModule", description="activegiveawa
             return await ctx.send("Sorry! You forgot to add your title! :open_mouth: Please try again! :slight_smile:")
         events_data = events.get_events_json()
         giveaway_check = False
-        for giveaway in events_data['giveaways']:
+        for giveaway in events_data.get('giveaways', {}):
             giveaway = events_data['giveaways'][giveaway]
             if giveaway['title'] == title and giveaway['giveaway_author'] == str(ctx.message.author):
                 giveaway_check = True
@@ -161,13 +165,15 @@ class eventsmodule(commands.Cog, name="EventsModule", description="activegiveawa
                 break
         if not giveaway_check:
             return await ctx.send("Sorry! You don't have a giveaway active! :cry:")
+        # remove giveaway, waiting for any participant still being added
+        async with events.transaction(events.giveaway_key(giveaway['message_id'])) as events_data:
+            giveaway = events_data['giveaways'].pop(str(giveaway['message_id']), None)
+        if giveaway is None:
+            return await ctx.send("Sorry! You don't have a giveaway active! :cry:")
         reaction = giveaway['reaction']
         days = datetime.now() - datetime.fromtimestamp(giveaway['start_time'])
         participants = giveaway['participants']
         rewards = giveaway['rewards']
-        # remove giveaway
-        events_data['giveaways'].pop(str(giveaway['message_id']))
-        events.set_events_json(events_data)
         # get winners
         party_keys = list(participants.keys())
         random.shuffle(party_keys)
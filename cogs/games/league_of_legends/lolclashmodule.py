@@ -6,25 +6,20 @@
 # - clashset command
 # *********************************************************************************************************************
 
-import os
-import discord
+import cogs.helper.api.riot_api as riot_api
 import cogs.helper.constants.lol_constants as lol_constants
 import cogs.helper.helper_functions.timezones as timezones
 import cogs.helper.helper_functions.events as events
 import cogs.helper.helper_functions.beebot_profiles as beebot_profiles
+import cogs.helper.helper_functions.attachment_cache as attachment_cache
 
 from discord.ext import commands
 from discord import Embed
 from typing import Optional
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
-from riotwatcher import LolWatcher, ApiError
 
-# get riot_lol_key from .env file
-load_dotenv()
-LOL_KEY = os.getenv('RIOT_LOL_KEY')
-lol_watcher = LolWatcher(LOL_KEY)
-default_region = 'na1'
+# riot default region
+default_region = riot_api.default_region
 
 # role specific names
 role_specific_command_name = 'Bot Commander'
@@ -61,7 +56,6 @@ class lolclashmodule(commands.Cog, name="LoLClashModule", description="clashadd,
             return await ctx.send('Invalid input! :flushed: Please specify either \'Sat\', \'Sun\', \'Both\', or role(s) '
                                   'after command! :smile:')
         available_member = str(ctx.message.author)
-        participants = clash_event['participants']
         roles = list(roles)
         avail_dict = {}
         if availability in lol_constants.lol_roles():
@@ -80,35 +74,35 @@ class lolclashmodule(commands.Cog, name="LoLClashModule", description="clashadd,
         role_msg = ''
         if roles_list:
             role_msg = 'and preferred role(s) '
-            beebot_profiles_data = beebot_profiles.get_beebot_profiles_json()
-            # add member's roles
-            beebot_profiles_data = beebot_profiles.beebot_profile_exists(
-                beebot_profiles_data, available_member)
-            beebot_profiles_data = beebot_profiles.beebot_profile_key_exists(
-                beebot_profiles_data, available_member, "league_of_legends")
-            beebot_profiles_data[available_member]["league_of_legends"][
-                'preferred_role(s)'] = roles_list
-            beebot_profiles_data = beebot_profiles.set_beebot_profiles_json(
-                beebot_profiles_data)
-        # check if member already registered
-        if available_member in participants and (availability == 'Sat' or availability == 'Sun' or availability == 'Both'):
-            member = participants[available_member]
-            if member['Sat'] == 1 and member['Sun'] == 1 and not roles_list:
-                await ctx.send('Your name was already added to the list for both days! :open_mouth:')
-            elif (member['Sat'] == 1 and availability == 'Sat') or (member['Sun'] == 1 and availability == 'Sun') and not roles_list:
-                await ctx.send('Your name was already added to the list for this day! :open_mouth:')
+            async with beebot_profiles.transaction(available_member) as beebot_profiles_data:
+                # add member's roles
+                beebot_profiles_data = beebot_profiles.beebot_profile_exists(
+                    beebot_profiles_data, available_member)
+                beebot_profiles_data = beebot_profiles.beebot_profile_key_exists(
+                    beebot_profiles_data, available_member, "league_of_legends")
+                beebot_profiles_data[available_member]["league_of_legends"][
+                    'preferred_role(s)'] = roles_list
+        async with events.transaction(events.clash_key(available_member)) as events_data:
+            participants = events_data['clash']['participants']
+            # check if member already registered
+            if available_member in participants and (availability == 'Sat' or availability == 'Sun' or availability == 'Both'):
+                member = participants[available_member]
+                if member['Sat'] == 1 and member['Sun'] == 1 and not roles_list:
+                    reply = 'Your name was already added to the list for both days! :open_mouth:'
+                elif (member['Sat'] == 1 and availability == 'Sat') or (member['Sun'] == 1 and availability == 'Sun') and not roles_list:
+                    reply = 'Your name was already added to the list for this day! :open_mouth:'
+                else:
+                    participants[available_member].update(
+                        avail_dict)
+                    reply = f"Your availability {role_msg}has been updated! :white_check_mark:"
+            elif availability in lol_constants.lol_roles() and roles_list:
+                reply = f"Your preferred role(s) has been updated! :white_check_mark:"
             else:
-                participants[available_member].update(
-                    avail_dict)
-                await ctx.send(f"Your availability {role_msg}has been updated! :white_check_mark:")
-        elif availability in lol_constants.lol_roles() and roles_list:
-            await ctx.send(f"Your preferred role(s) has been updated! :white_check_mark:")
-        else:
-            participants[available_member] = {
-                'Sat': 0, 'Sun': 0}
-            participants[available_member].update(avail_dict)
-            await ctx.send(f"Your availability {role_msg}has been updated! :white_check_mark:")
-        events.set_events_json(events_data)
+                participants[available_member] = {
+                    'Sat': 0, 'Sun': 0}
+                participants[available_member].update(avail_dict)
+                reply = f"Your availability {role_msg}has been updated! :white_check_mark:"
+        await ctx.send(reply)
 
     # *********************************************************************************************************************
     # bot command to remove author from availability list
@@ -134,23 +128,24 @@ class lolclashmodule(commands.Cog, name="LoLClashModule", description="clashadd,
                                   'after command! :smile:')
         # check if member already registered
         available_member = str(ctx.message.author)
-        participants = clash_event['participants']
         if availability == 'Both':
             avail_dict = {'Sat': 0, 'Sun': 0}
         else:
             avail_dict = {availability: 0}
-        if available_member not in participants:
-            return await ctx.send('Your name wasn\'t on the list. :thinking: Add it with the "addclash" command! :smile:')
-        member = participants[available_member]
-        if (member['Sat'] == 0 and availability == 'Sat') or (member['Sun'] == 0 and availability == 'Sun'):
-            await ctx.send('You\'re already not signed up for this day! :open_mouth:')
-        else:
-            participants[available_member].update(
-                avail_dict)
-            if participants[available_member] == {'Sat': 0, 'Sun': 0}:
-                participants.pop(available_member)
-            events.set_events_json(events_data)
-            await ctx.send('Your name was removed from the availability list for this day(s). :slight_smile:')
+        async with events.transaction(events.clash_key(available_member)) as events_data:
+            participants = events_data['clash']['participants']
+            if available_member not in participants:
+                reply = 'Your name wasn\'t on the list. :thinking: Add it with the "addclash" command! :smile:'
+            elif (participants[available_member]['Sat'] == 0 and availability == 'Sat') or \
+                    (participants[available_member]['Sun'] == 0 and availability == 'Sun'):
+                reply = 'You\'re already not signed up for this day! :open_mouth:'
+            else:
+                participants[available_member].update(
+                    avail_dict)
+                if participants[available_member] == {'Sat': 0, 'Sun': 0}:
+                    participants.pop(available_member)
+                reply = 'Your name was removed from the availability list for this day(s). :slight_smile:'
+        await ctx.send(reply)
 
     # *********************************************************************************************************************
     # bot command to view clash availability list
@@ -200,10 +195,6 @@ class lolclashmodule(commands.Cog, name="LoLClashModule", description="clashadd,
                       f"*{date.astimezone(timezones.get_pacific_timezone()).strftime('%A, %B %-d, %Y @ %-I:%M%p (%Z)')}*\n"
                       f"*{date.astimezone(timezones.get_eastern_timezone()).strftime('%A, %B %-d, %Y @ %-I:%M%p (%Z)')}*",
                       colour=ctx.author.colour)
-        # embed thumbnail
-        file = discord.File(
-            f"resource_files/image_files/thumbnails/lolclash_thumb.png", filename="image.png")
-        embed.set_thumbnail(url='attachment://image.png')
         # embed fields
         for day in available_days:
             if available_days[day]:
@@ -213,7 +204,9 @@ class lolclashmodule(commands.Cog, name="LoLClashModule", description="clashadd,
                     clash_date = date
                 embed.add_field(name=clash_date.astimezone(timezones.get_pacific_timezone()).strftime(
                     '%A, %B %-d, %Y:'), value='\n'.join(available_days[day]), inline=False)
-        await ctx.send(file=file, embed=embed)
+        # embed thumbnail
+        await attachment_cache.send_embed_with_file(
+            ctx, embed, "resource_files/image_files/thumbnails/lolclash_thumb.png", thumbnail=True)
 
     # *********************************************************************************************************************
     # bot command to set clash date
@@ -224,7 +217,7 @@ class lolclashmodule(commands.Cog, name="LoLClashModule", description="clashadd,
     @commands.has_role(admin_specific_command_name)
     async def clash_set(self, ctx):
         # API call
-        clash_data = lol_watcher.clash.tournaments(default_region)
+        clash_data = await riot_api.clash_tournaments(default_region)
         # get dictionary of upcoming clash tournaments
         clash_dict = {}
         for clash in clash_data:
@@ -241,23 +234,23 @@ class lolclashmodule(commands.Cog, name="LoLClashModule", description="clashadd,
                 break
         # add 'participants' field
         current_clash['participants'] = {}
-        events_data = events.get_events_json()
-        # check if 'clash' key exists
-        if events.check_event(events_data, 'clash'):
-            # update current clash with the next clash
-            date = datetime.fromtimestamp(
-                events_data['clash']['schedule'][0]['startTime'] / 1e3)
-            if date < datetime.now():
-                events_data['clash'] = current_clash
-                events.set_events_json(events_data)
-                await ctx.send("Updated clash!")
+        # lock the whole clash event, no signup can land in the clash being replaced
+        async with events.transaction(events.clash_key()) as events_data:
+            # check if 'clash' key exists
+            if events.check_event(events_data, 'clash'):
+                # update current clash with the next clash
+                date = datetime.fromtimestamp(
+                    events_data['clash']['schedule'][0]['startTime'] / 1e3)
+                if date < datetime.now():
+                    events_data['clash'] = current_clash
+                    reply = "Updated clash!"
+                else:
+                    reply = "Hold your horses.. The upcoming clash hasn't even happened yet!"
+            # add 'clash' key if it doesn't exist
             else:
-                await ctx.send("Hold your horses.. The upcoming clash hasn't even happened yet!")
-        # add 'clash' key if it doesn't exist
-        else:
-            events_data['clash'] = current_clash
-            events.set_events_json(events_data)
-            await ctx.send("New clash key!")
+                events_data['clash'] = current_clash
+                reply = "New clash key!"
+        await ctx.send(reply)
 
 
 def setup(bot):
@@ -7,30 +7,29 @@
 # - lol_live_game command
 # *********************************************************************************************************************
 
-import os
+import asyncio
 import discord
 import random
-import requests
 import cogs.helper.helper_functions.images as images
+import cogs.helper.helper_functions.attachment_cache as attachment_cache
 import cogs.helper.constants.lol_constants as lol_constants
 import cogs.helper.api.league_of_legends_api as lol_api
+import cogs.helper.api.riot_api as riot_api
 
 from discord.ext import commands
 from discord import Embed
 from typing import Optional
-from dotenv import load_dotenv
-from riotwatcher import LolWatcher, ApiError
 
-# get riot_lol_key from .env file
-load_dotenv()
-LOL_KEY = os.getenv('RIOT_LOL_KEY')
-lol_watcher = LolWatcher(LOL_KEY)
-default_region = 'na1'
+# riot default region
+default_region = riot_api.default_region
 
 # role specific names
 role_specific_command_name = 'Bot Commander'
 admin_specific_command_name = 'Bot Admin'
 
+# max riot requests in flight for a single lollivegame lookup
+participant_lookup_limit = 5
+
 # lolinfomodule class
 
 
@@ -38,6 +37,8 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
                     description="champlookup, champskills, lollivegame, lolbalance, pickskin"):
     def __init__(self, bot):
         self.bot = bot
+        # keep the champion catalog warm in the background
+        lol_api.start_catalog_refresh()
 
     # *********************************************************************************************************************
     # bot command to lookup basic league of legends champion info
@@ -47,17 +48,17 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
     # only specific roles can use this command
     @commands.has_role(role_specific_command_name)
     async def champ_lookup(self, ctx, *, lol_champion: Optional[str]):
-        # get current lol version for region
-        champions_version = lol_api.get_version()['n']['champion']
-        champ_list = lol_api.get_champion_list(champions_version)['data']
+        # get current lol champion catalog for region
+        catalog = await lol_api.get_catalog()
+        champions_version = catalog.version
         if lol_champion == None:
-            lol_champion = random.choice(list(champ_list))
-        else:
-            lol_champion = lol_api.champion_string_formatting(lol_champion)
-        if lol_champion not in champ_list:
+            lol_champion = random.choice(list(catalog.by_id))
+        champion_record = catalog.find_champion(lol_champion)
+        if champion_record is None:
             return await ctx.send("Sorry! An error has occurred! :cry: Check your spelling and try again! :slight_smile:")
+        lol_champion = champion_record['id']
         # API champion info
-        champion_info = champ_list[lol_champion]
+        champion_info = champion_record
         # *********
         # | embed |
         # *********
@@ -86,19 +87,17 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
     # only specific roles can use this command
     @commands.has_role(role_specific_command_name)
     async def champ_skill(self, ctx, *, lol_champion: Optional[str]):
-        # get current lol version for region
-        champions_version = lol_api.get_version()['n']['champion']
-        champ_list = lol_api.get_champion_list(champions_version)['data']
+        # get current lol champion catalog for region
+        catalog = await lol_api.get_catalog()
+        champions_version = catalog.version
         if lol_champion == None:
-            lol_champion = random.choice(list(champ_list))
-        else:
-            lol_champion = lol_api.champion_string_formatting(lol_champion)
-        if lol_champion not in champ_list:
+            lol_champion = random.choice(list(catalog.by_id))
+        champion_record = catalog.find_champion(lol_champion)
+        if champion_record is None:
             return await ctx.send("Sorry! An error has occurred! :cry: Check your spelling and try again! :slight_smile:")
+        lol_champion = champion_record['id']
         # API full champion info
-        response = requests.get(
-            f'http://ddragon.leagueoflegends.com/cdn/{champions_version}/data/en_US/champion/{lol_champion}.json')
-        champion_info = response.json()['data'][lol_champion]
+        champion_info = await lol_api.get_champion_detail(champions_version, lol_champion)
         # *********
         # | embed |
         # *********
@@ -130,19 +129,17 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
     # only specific roles can use this command
     @commands.has_role(role_specific_command_name)
     async def pick_skin(self, ctx, *, lol_champion: Optional[str]):
-        # get current lol version for region
-        champions_version = lol_api.get_version()['n']['champion']
-        champ_list = lol_api.get_champion_list(champions_version)['data']
+        # get current lol champion catalog for region
+        catalog = await lol_api.get_catalog()
+        champions_version = catalog.version
         if lol_champion == None:
-            lol_champion = random.choice(list(champ_list))
-        else:
-            lol_champion = lol_api.champion_string_formatting(lol_champion)
-        if lol_champion not in champ_list:
+            lol_champion = random.choice(list(catalog.by_id))
+        champion_record = catalog.find_champion(lol_champion)
+        if champion_record is None:
             return await ctx.send("Sorry! An error has occurred! :cry: Check your spelling and try again! :slight_smile:")
+        lol_champion = champion_record['id']
         # API champion info
-        response = requests.get(
-            f'http://ddragon.leagueoflegends.com/cdn/{champions_version}/data/en_US/champion/{lol_champion}.json')
-        champion_info = response.json()['data'][lol_champion]
+        champion_info = await lol_api.get_champion_detail(champions_version, lol_champion)
         # get skin number dict
         num_dict = {}
         for skin in champion_info['skins']:
@@ -171,26 +168,27 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
     async def lol_balance(self, ctx, *lol_champions):
         if not lol_champions:
             return await ctx.send("Sorry! You forgot to add champions! :slight_smile:")
-        # get current lol version for region
-        champions_version = lol_api.get_version()['n']['champion']
-        champ_list = lol_api.get_champion_list(champions_version)['data']
+        # get current lol champion catalog for region
+        catalog = await lol_api.get_catalog()
+        champions_version = catalog.version
+        champ_list = catalog.champions
         check = True
         # iterate through champion tags and info (affinity)
         tags_list = []
         affinity = {'AD': 0, 'AP': 0, 'DEF': 0}
+        team_champion_ids = []
         for champion in lol_champions:
-            # format string
-            champion = champion.replace("'", '').lower(
-            ).title().replace(' ', '').strip('"')
-            if champion not in champ_list:
+            champion_record = catalog.find_champion(champion.strip('"'))
+            if champion_record is None:
                 check = False
             else:
+                team_champion_ids.append(champion_record['id'])
                 # tags
-                tags = champ_list[champion]['tags']
+                tags = champion_record['tags']
                 for tag in tags:
                     tags_list.append(tag)
                 # info (affinity)
-                aff = champ_list[champion]['info']
+                aff = champion_record['info']
                 ad = affinity['AD'] + aff['attack']
                 ap = affinity['AP'] + aff['magic']
                 de = affinity['DEF'] + aff['defense']
@@ -232,10 +230,6 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
         embed = Embed(title="Teamcomp Balance",
                       description="Check if your team is well balanced! :D",
                       colour=discord.Colour.random())
-        # embed thumbnail
-        file = discord.File(
-            f'resource_files/image_files/thumbnails/lolbalance_thumb.png', filename="image.png")
-        embed.set_thumbnail(url='attachment://image.png')
         # embed fields
         fields = [(f"Highest Affinity:", f"***{highest_aff}***", True),
                   (f"Most Common Tag:",
@@ -247,7 +241,16 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
         if not missing_tags:
             embed.add_field(name=f':tada: Congrats! Your team covers all of the available tags! :tada:',
                             value='Now you\'re ready to hit the rift!', inline=False)
-        msg = await ctx.send(file=file, embed=embed)
+        # embed image (the team's champions, 5 per row)
+        team_icon_urls = [f'http://ddragon.leagueoflegends.com/cdn/{champions_version}/img/champion/{champion_id}.png'
+                          for champion_id in team_champion_ids]
+        team_image = await images.render_icon_grid(
+            [team_icon_urls[i:i + 5] for i in range(0, len(team_icon_urls), 5)])
+        embed.set_image(url='attachment://team.png')
+        # embed thumbnail
+        msg = await attachment_cache.send_embed_with_file(
+            ctx, embed, 'resource_files/image_files/thumbnails/lolbalance_thumb.png', thumbnail=True,
+            extra_files=[discord.File(team_image, filename="team.png")])
         await msg.add_reaction("❌")
 
     # *********************************************************************************************************************
@@ -286,7 +289,7 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
             summoner_check = True
             try:
                 # get summoner info
-                summoner = lol_watcher.summoner.by_name(
+                summoner = await riot_api.summoner_by_name(
                     region, f"{''.join(summoner_name)}")
             except:
                 summoner_check = False
@@ -296,40 +299,24 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
             spectator_check = True
             try:
                 # get spectator info
-                spectator = lol_watcher.spectator.by_summoner(
+                spectator = await riot_api.spectator_by_summoner(
                     region, summoner['id'])
             except:
                 spectator_check = False
                 return await ctx.send("Sorry! The summoner name you inputed isn't currently in a League of Legends game! :cry:\n"
                                       "Please try again with a current LoL game! :slight_smile:")
         if summoner_check and spectator_check:
-            # get current lol version for region
-            champions_version = lol_api.get_version(region)[
-                'n']['champion']
-            champ_list = lol_api.get_champion_list(
-                champions_version)['data']
-            new_participants_list = []
-            for participant in spectator['participants']:
-                participant_summoner_id = participant['summonerId']
-                # get ranks
-                ranks = lol_watcher.league.by_summoner(
-                    region, participant_summoner_id)
-                for rank in ranks:
-                    if 'RANKED_SOLO_5x5' in rank.values():
-                        participant['rank'] = rank
-                        break
-                # get masteries
-                masteries = lol_watcher.champion_mastery.by_summoner(
-                    region, participant_summoner_id)
-                participant['masteries'] = masteries
+            # get current lol champion catalog for region
+            catalog = await lol_api.get_catalog(region)
+            champions_version = catalog.version
+            # lookup every participant's rank and mastery concurrently (results keep the spectator order)
+            lookup_slots = asyncio.Semaphore(participant_lookup_limit)
+            new_participants_list = await asyncio.gather(*[
+                get_participant_stats(region, participant, lookup_slots)
+                for participant in spectator['participants']])
+            for participant in new_participants_list:
                 # get current champion
-                for champion in champ_list:
-                    if participant['championId'] == int(champ_list[champion]['key']):
-                        participant['currentChampion'] = champ_list[champion]
-                    if 'top_mastery' in participant and 'currentChampion' in participant:
-                        break
-                # add to new_participants_list
-                new_participants_list.append(participant)
+                participant['currentChampion'] = await lol_api.get_champion_by_key(participant['championId'], region)
             if spectator['gameMode'] == 'CLASSIC':
                 spectator['gameMode'] = 'Summoner\'s Rift'
             else:
@@ -353,12 +340,8 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
                           colour=ctx.author.colour)
             # embed thumbnail
             thumb_url = f"http://ddragon.leagueoflegends.com/cdn/{champions_version}/img/profileicon/{summoner['profileIconId']}.png"
-            thumb_image = images.get_image_by_url(thumb_url)
-            thumb_image = images.resize_image(thumb_image, 50, 50)
-            images.save_image(thumb_image, images.get_image_path(
-                'riot_images/spectator/thumbnail.png'))
-            file = discord.File(
-                f"resource_files/image_files/riot_images/spectator/thumbnail.png", filename="image.png")
+            thumb_image = await images.fetch_resized_image(thumb_url, 50, 50)
+            file = discord.File(thumb_image, filename="image.png")
             embed.set_thumbnail(url='attachment://image.png')
             # embed fields
             enemy_team = []
@@ -366,6 +349,8 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
             summoner_team = []
             summoner_team_rank_wr = []
             enemy_team_high_mastery = []
+            # champion icon rows for the embed image (enemy team on top, same order as the fields)
+            team_icon_urls = {'enemy': [], 'summoner': []}
             # summoner_runes_image_path = images.get_image_path(
             #     'riot_images/spectator/runes.png')
             for participant in new_participants_list:
@@ -385,8 +370,12 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
                 #         ddragon_images_url + rune_substyle_image_url)
                 #     images.merge_images_width_wise(
                 #         rune_style_image, rune_substyle_image, summoner_runes_image_path)
+                champion_icon_url = None
+                if participant['currentChampion']['id'] is not None:
+                    champion_icon_url = f"http://ddragon.leagueoflegends.com/cdn/{champions_version}/img/champion/{participant['currentChampion']['id']}.png"
                 # summoner's team
                 if participant['teamId'] == summoner_team_id:
+                    team_icon_urls['summoner'].append(champion_icon_url)
                     # Your Team section
                     summoner_team = summoner_team + \
                         [f"**{participant['summonerName']} - {participant['currentChampion']['name']}**"]
@@ -405,6 +394,7 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
                         [rank_string]
                 # enemy team
                 else:
+                    team_icon_urls['enemy'].append(champion_icon_url)
                     enemy_team = enemy_team + \
                         [f"**{participant['summonerName']} - {participant['currentChampion']['name']}**"]
                     # Enemy Team section
@@ -422,12 +412,10 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
                     enemy_team_rank_wr = enemy_team_rank_wr + \
                         [rank_string]
                     # Enemy Team High Mastery section
-                    for mastery in participant['masteries']:
-                        if participant['championId'] == mastery['championId']:
-                            if mastery['championPoints'] > 200000:
-                                enemy_team_high_mastery = enemy_team_high_mastery + \
-                                    [f"{participant['summonerName']} ({participant['currentChampion']['name']})"]
-                            break
+                    mastery = participant['championMastery']
+                    if mastery and mastery['championPoints'] > 200000:
+                        enemy_team_high_mastery = enemy_team_high_mastery + \
+                            [f"{participant['summonerName']} ({participant['currentChampion']['name']})"]
             if not enemy_team_high_mastery:
                 enemy_team_high_mastery = ['None']
             embed.add_field(name='Enemy Team:',
@@ -446,11 +434,43 @@ class lolinfomodule(commands.Cog, name="LoLInfoModule",
             # file = discord.File(
             #     f'resource_files/image_files/riot_images/spectator/runes.png', filename="image.png")
             # embed.set_image(url='attachment://image.png')
-            msg = await ctx.send(file=file, embed=embed)
-            images.delete_image(images.get_image_path(
-                'riot_images/spectator/thumbnail.png'))
+            # embed image
+            teams_image = await images.render_icon_grid([team_icon_urls['enemy'], team_icon_urls['summoner']])
+            embed.set_image(url='attachment://teams.png')
+            msg = await ctx.send(files=[file, discord.File(teams_image, filename="teams.png")], embed=embed)
             await msg.add_reaction("❌")
 
 
+# *********************************************************************************************************************
+# helper functions
+# *********************************************************************************************************************
+async def get_participant_stats(region, participant, lookup_slots):
+    participant_summoner_id = participant['summonerId']
+
+    async def get_solo_rank():
+        async with lookup_slots:
+            ranks = await riot_api.league_by_summoner(region, participant_summoner_id)
+        for rank in ranks:
+            if 'RANKED_SOLO_5x5' in rank.values():
+                return rank
+        return None
+
+    async def get_champion_mastery():
+        # only the mastery of the champion being played is needed
+        async with lookup_slots:
+            try:
+                return await riot_api.champion_mastery_by_summoner_by_champion(
+                    region, participant_summoner_id, participant['championId'])
+            except riot_api.ApiError:
+                # 404 when the summoner has never played the champion
+                return None
+
+    rank, mastery = await asyncio.gather(get_solo_rank(), get_champion_mastery())
+    if rank:
+        participant['rank'] = rank
+    participant['championMastery'] = mastery
+    return participant
+
+
 def setup(bot):
     bot.add_cog(lolinfomodule(bot))
@@ -9,24 +9,20 @@
 # - lol_randomchamp command
 # *********************************************************************************************************************
 
-import os
 import discord
 import random
 import cogs.helper.api.league_of_legends_api as lol_api
+import cogs.helper.api.riot_api as riot_api
 import cogs.helper.constants.lol_constants as lol_constants
 import cogs.helper.helper_functions.beebot_profiles as beebot_profiles
+import cogs.helper.helper_functions.attachment_cache as attachment_cache
 
 from discord.ext import commands
 from discord import Embed
 from typing import Optional
-from dotenv import load_dotenv
-from riotwatcher import LolWatcher, ApiError
 
-# get riot_lol_key from .env file
-load_dotenv()
-LOL_KEY = os.getenv('RIOT_LOL_KEY')
-lol_watcher = LolWatcher(LOL_KEY)
-default_region = 'na1'
+# riot default region
+default_region = riot_api.default_region
 
 # role specific names
 role_specific_command_name = 'Bot Commander'
@@ -41,6 +37,8 @@ CHAMP_POOL_KEY = 'champ_pool'
 class lolprofilemodule(commands.Cog, name="LoLProfileModule", description="lolprofile, lolmastery, lolrank"):
     def __init__(self, bot):
         self.bot = bot
+        # keep the champion catalog warm in the background
+        lol_api.start_catalog_refresh()
 
     # *********************************************************************************************************************
     # bot command to show the full profile of a given summoner name (shows rank and mastery)
@@ -76,34 +74,26 @@ class lolprofilemodule(commands.Cog, name="LoLProfileModule", description="lolpr
             summoner_check = True
             try:
                 # get summoner info
-                summoner = lol_watcher.summoner.by_name(
+                summoner = await riot_api.summoner_by_name(
                     region, f"{''.join(summoner_name)}")
             except:
                 summoner_check = False
                 return await ctx.send("Sorry! The summoner name you inputed doesn't exist! :cry:\n"
                                       "Please try again with a real lol summoner! :slight_smile:")
         if summoner_check:
-            # get current lol version for region
-            champions_version = lol_api.get_version(region)[
-                'n']['champion']
+            # get current lol champion catalog for region
+            catalog = await lol_api.get_catalog(region)
+            champions_version = catalog.version
             # get summoner ranks
-            ranks = lol_watcher.league.by_summoner(
+            ranks = await riot_api.league_by_summoner(
                 region, summoner['id'])
             # get total mastery
-            total_mastery = lol_watcher.champion_mastery.scores_by_summoner(
+            total_mastery = await riot_api.champion_mastery_scores_by_summoner(
                 region, summoner['id'])
             # get top mastery
-            top_mastery = lol_watcher.champion_mastery.by_summoner(region, summoner['id'])[
-                0]
+            top_mastery = (await riot_api.champion_mastery_by_summoner(region, summoner['id']))[0]
             # get top mastery champ
-            champ_list = lol_api.get_champion_list(
-                champions_version)['data']
-            top_master_champ_info = ''
-            for champion in champ_list:
-                if top_mastery['championId'] == int(champ_list[champion]['key']):
-                    top_master_champ_info = champion
-                    break
-            top_master_champ_info = champ_list[top_master_champ_info]
+            top_master_champ_info = await lol_api.get_champion_by_key(top_mastery['championId'], region)
             # *********
             # | embed |
             # *********
@@ -165,30 +155,23 @@ class lolprofilemodule(commands.Cog, name="LoLProfileModule", description="lolpr
             summoner_check = True
             try:
                 # get summoner info
-                summoner = lol_watcher.summoner.by_name(
+                summoner = await riot_api.summoner_by_name(
                     region, f"{''.join(summoner_name)}")
             except:
                 summoner_check = False
                 return await ctx.send("Sorry! The summoner name you inputed doesn't exist! :cry:\n"
                                       "Please try again with a real lol summoner! :slight_smile:")
         if summoner_check:
-            # get current lol version for region
-            champions_version = lol_api.get_version()['n']['champion']
+            # get current lol champion catalog for region
+            catalog = await lol_api.get_catalog()
+            champions_version = catalog.version
             # get total mastery
-            total_mastery = lol_watcher.champion_mastery.scores_by_summoner(
+            total_mastery = await riot_api.champion_mastery_scores_by_summoner(
                 region, summoner['id'])
             # get top mastery
-            top_mastery = lol_watcher.champion_mastery.by_summoner(region, summoner['id'])[
-                0]
+            top_mastery = (await riot_api.champion_mastery_by_summoner(region, summoner['id']))[0]
             # get top mastery champ
-            champ_list = lol_api.get_champion_list(
-                champions_version)['data']
-            top_master_champ_info = ''
-            for champion in champ_list:
-                if top_mastery['championId'] == int(champ_list[champion]['key']):
-                    top_master_champ_info = champion
-                    break
-            top_master_champ_info = champ_list[top_master_champ_info]
+            top_master_champ_info = await lol_api.get_champion_by_key(top_mastery['championId'], region)
             # *********
             # | embed |
             # *********
@@ -196,8 +179,9 @@ class lolprofilemodule(commands.Cog, name="LoLProfileModule", description="lolpr
                           description=f"Summoner Level: {summoner['summonerLevel']}",
                           colour=ctx.author.colour)
             # embed thumbnail
-            thumb_url = f"http://ddragon.leagueoflegends.com/cdn/{champions_version}/img/champion/{top_master_champ_info['id']}.png"
-            embed.set_thumbnail(url=thumb_url)
+            if top_master_champ_info['id'] is not None:
+                thumb_url = f"http://ddragon.leagueoflegends.com/cdn/{champions_version}/img/champion/{top_master_champ_info['id']}.png"
+                embed.set_thumbnail(url=thumb_url)
             # embed fields
             fields = [("Total Champion Mastery Score:", f"*{total_mastery}*", False),
                       ("Highest Mastery Champion:",
@@ -243,18 +227,18 @@ class lolprofilemodule(commands.Cog, name="LoLProfileModule", description="lolpr
             summoner_check = True
             try:
                 # get summoner info
-                summoner = lol_watcher.summoner.by_name(
+                summoner = await riot_api.summoner_by_name(
                     region, f"{''.join(summoner_name)}")
             except:
                 summoner_check = False
                 return await ctx.send("Sorry! The summoner name you inputed doesn't exist! :cry:\n"
                                       "Please try again with a real lol summoner! :slight_smile:")
         if summoner_check:
-            # get current lol version for region
-            champions_version = lol_api.get_version(region)[
-                'n']['champion']
+            # get current lol champion catalog for region
+            catalog = await lol_api.get_catalog(region)
+            champions_version = catalog.version
             # get summoner ranks
-            ranks = lol_watcher.league.by_summoner(
+            ranks = await riot_api.league_by_summoner(
                 region, summoner['id'])
             # *********
             # | embed |
@@ -279,10 +263,9 @@ class lolprofilemodule(commands.Cog, name="LoLProfileModule", description="lolpr
                 embed.add_field(
                     name=f"Average Rank:", value=f"{final_rank['tier'].title()} {final_rank['rank']}", inline=False)
                 # embed thumbnail
-                file = discord.File(
-                    f"resource_files/image_files/riot_images/ranked_emblems/Emblem_{final_rank['tier'].title()}.png", filename="image.png")
-                embed.set_thumbnail(url='attachment://image.png')
-                await ctx.send(file=file, embed=embed)
+                await attachment_cache.send_embed_with_file(
+                    ctx, embed, f"resource_files/image_files/riot_images/ranked_emblems/Emblem_{final_rank['tier'].title()}.png",
+                    thumbnail=True)
             else:
                 embed.add_field(name="This summoner has nothing for ranked this season.",
                                 value="Maybe it's time?... 👀", inline=False)
@@ -342,29 +325,25 @@ class lolprofilemodule(commands.Cog, name="LoLProfileModule", description="lolpr
         if not champions:
             await ctx.send("You must provide a list of champions to add to your pool")
 
-        # Retrieve persisted champ pools from beebot profiles.
-        beebot_profiles_data = beebot_profiles.get_beebot_profiles_json()
-        user_profile = beebot_profiles_data.get(str(ctx.message.author), {})
-        user_champ_pool = user_profile.get(CHAMP_POOL_KEY, {})
-        role_champ_pool = user_champ_pool.get(role, [])
-
-        # Validate specified champions and deduplicate entries
+        # Validate specified champions
         champ_add_success = False
         champ_add_failed_list = []
-        champions_version = lol_api.get_version()['n']['champion']
-        champ_list = lol_api.get_champion_list(champions_version)['data']
+        champ_add_list = []
+        catalog = await lol_api.get_catalog()
+        champions_version = catalog.version
         for champion_name in champions:
-            formatted_champ_name = lol_api.champion_string_formatting(champion_name)
-            if formatted_champ_name not in champ_list:
+            champion_record = catalog.find_champion(champion_name)
+            if champion_record is None:
                 champ_add_failed_list.append(champion_name)
             else:
-                role_champ_pool.append(champ_list[formatted_champ_name]['name'])
+                champ_add_list.append(champion_record['name'])
                 champ_add_success = True
 
-        role_champ_pool = sorted(set(role_champ_pool))
-
-        # Persist the updated profile data
-        beebot_profiles.set_beebot_profiles_json(beebot_profiles_data)
+        # Update the persisted champ pool, deduplicating entries
+        user = str(ctx.message.author)
+        async with beebot_profiles.transaction(user) as beebot_profiles_data:
+            user_champ_pool = beebot_profiles_data.setdefault(user, {}).setdefault(CHAMP_POOL_KEY, {})
+            user_champ_pool[role] = sorted(set(user_champ_pool.get(role, []) + champ_add_list))
 
         if champ_add_failed_list and champ_add_success:
             invalid_champs = ', '.join(champ_add_failed_list)
@@ -395,25 +374,20 @@ class lolprofilemodule(commands.Cog, name="LoLProfileModule", description="lolpr
         if not champions:
             await ctx.send("You must provide a list of champions to add to your pool")
 
-        # Retrieve persisted champ pools from beebot profiles.
-        beebot_profiles_data = beebot_profiles.get_beebot_profiles_json()
-        user_profile = beebot_profiles_data.get(str(ctx.message.author), {})
-        user_champ_pool = user_profile.get(CHAMP_POOL_KEY, {})
-        role_champ_pool = user_champ_pool.get(role, [])
-
-        # Remove champions from the specified role's champ pool if they exist
+        # Remove champions from the specified role's persisted champ pool if they exist
         champ_remove_success = False
         champ_remove_failed_list = []
-        for champion_name in champions:
-            try:
-                role_champ_pool.remove(champion_name)
-                champ_remove_success = True
-            except ValueError:
-                champ_remove_failed_list.append(champion_name)
-        role_champ_pool = sorted(role_champ_pool)
-
-        # Persist the updated profile data
-        beebot_profiles.set_beebot_profiles_json(beebot_profiles_data)
+        user = str(ctx.message.author)
+        async with beebot_profiles.transaction(user) as beebot_profiles_data:
+            user_champ_pool = beebot_profiles_data.setdefault(user, {}).setdefault(CHAMP_POOL_KEY, {})
+            role_champ_pool = user_champ_pool.get(role, [])
+            for champion_name in champions:
+                try:
+                    role_champ_pool.remove(champion_name)
+                    champ_remove_success = True
+                except ValueError:
+                    champ_remove_failed_list.append(champion_name)
+            user_champ_pool[role] = sorted(role_champ_pool)
 
         if champ_remove_failed_list and champ_remove_success:
             invalid_champs = ', '.join(champ_remove_failed_list)
@@ -454,11 +428,14 @@ class lolprofilemodule(commands.Cog, name="LoLProfileModule", description="lolpr
         # *********
         # | embed |
         # *********
-        formatted_champ_name = lol_api.champion_string_formatting(chosen_champ)
         embed = Embed(title=chosen_champ, colour=discord.Colour.random())
-        champions_version = lol_api.get_version()['n']['champion']
-        thumb_url = f'http://ddragon.leagueoflegends.com/cdn/{champions_version}/img/champion/{formatted_champ_name}.png'
-        embed.set_thumbnail(url=thumb_url)
+        catalog = await lol_api.get_catalog()
+        champions_version = catalog.version
+        champion_record = catalog.find_champion(chosen_champ)
+        # a stored name can stop resolving (ex: renamed champion), the pick is still shown, just without its icon
+        if champion_record is not None:
+            thumb_url = f'http://ddragon.leagueoflegends.com/cdn/{champions_version}/img/champion/{champion_record["id"]}.png'
+            embed.set_thumbnail(url=thumb_url)
         await ctx.send(embed=embed)
 
 
@@ -4,29 +4,222 @@
 # *********************************************************************************************************************
 
 import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import cogs.helper.api.riot_api as riot_api
+import cogs.helper.helper_functions.files as files
 
+from discord.ext import tasks
 from dotenv import load_dotenv
-from riotwatcher import LolWatcher, ApiError
 
-# get riot_lol_key from .env file
+default_region = riot_api.default_region
+
+# how often to check data dragon for a new patch (seconds)
+catalog_ttl = 3600
+# an unknown champion id (ex: champion released since the last refresh) refreshes the catalog at most this often
+unknown_champion_refresh_interval = 300
+
+# region -> champions version, champions version -> ChampionCatalog
+_region_versions = {}
+_catalogs = {}
+_catalog_lock = asyncio.Lock()
+# region -> time the catalog was last refreshed because of an unknown champion id
+_unknown_champion_refreshes = {}
+
+# get current directory
+current_directory = os.path.dirname(os.path.realpath(__file__))
+ddragon_mirror_directory = "/".join(list(current_directory.split('/')
+                                         [0:-3])) + '/resource_files/ddragon_mirror'
+
+# download every champion detail file as soon as a new patch lands (set in .env)
 load_dotenv()
-LOL_KEY = os.getenv('RIOT_LOL_KEY')
-lol_watcher = LolWatcher(LOL_KEY)
-default_region = 'na1'
+ddragon_prefetch = os.getenv('LOL_DDRAGON_PREFETCH', 'false').lower() == 'true'
+ddragon_prefetch_limit = 8
+
+# champions version -> set of champion ids already mirrored on disk
+_mirror_index = {}
+# running prefetches (kept referenced so they aren't garbage collected mid download)
+_prefetch_tasks = set()
+
+
+class ChampionCatalog:
+    """Champion data of a single data dragon version, shared by every region on that patch.
+    The lookup indexes are built once per patch so commands never scan the champion list.
+    """
+
+    __slots__ = ('version', 'champions', 'by_key', 'by_id', 'by_name')
+
+    def __init__(self, version, champions):
+        self.version = version
+        self.champions = champions
+        # numeric championId (as used by the riot api) -> champion record
+        self.by_key = {int(champion['key']): champion for champion in champions.values()}
+        # canonical data dragon id (ex: MonkeyKing) -> champion record
+        self.by_id = dict(champions)
+        # normalized display name and id (ex: wukong, monkeyking) -> champion record
+        self.by_name = {}
+        for champion in champions.values():
+            self.by_name[normalize_champion_name(champion['id'])] = champion
+        for champion in champions.values():
+            self.by_name[normalize_champion_name(champion['name'])] = champion
+
+    def find_champion(self, champion_name):
+        # returns the champion record for a user typed name, or None
+        champion = self.by_id.get(champion_name)
+        if champion is None:
+            champion = self.by_name.get(normalize_champion_name(champion_name))
+        return champion
+
+
+# *********************************************************************************************************************
+# champion catalog
+# *********************************************************************************************************************
+async def refresh_catalog(region=default_region):
+    version = (await riot_api.data_dragon_versions_for_region(region))['n']['champion']
+    new_patch = version not in _catalogs
+    if new_patch:
+        champions = (await riot_api.data_dragon_champions(version))['data']
+        _catalogs[version] = ChampionCatalog(version, champions)
+    # swap the region over in one assignment so commands never see a half built catalog
+    _region_versions[region] = version
+    # forget patches no region is on anymore
+    for old_version in set(_catalogs) - set(_region_versions.values()):
+        _catalogs.pop(old_version, None)
+    if new_patch:
+        evict_old_mirrors()
+        if ddragon_prefetch:
+            task = asyncio.ensure_future(prefetch_champion_details(version, list(_catalogs[version].by_id)))
+            _prefetch_tasks.add(task)
+            task.add_done_callback(_prefetch_tasks.discard)
+    return _catalogs[version]
+
+
+async def get_catalog(region=default_region):
+    version = _region_versions.get(region)
+    if version is None:
+        # first lookup for this region, only one command fetches it
+        async with _catalog_lock:
+            if region not in _region_versions:
+                return await refresh_catalog(region)
+            version = _region_versions[region]
+    return _catalogs[version]
+
+
+def unknown_champion(champion_key):
+    # stand-in record so commands can still show the rest of their info (no id, so no icon)
+    return {'id': None, 'key': str(champion_key), 'name': 'Unknown Champion'}
+
+
+async def get_champion_by_key(champion_key, region=default_region):
+    """Champion record for a numeric championId (as used by the riot api).
+    An id missing from the cached catalog refreshes it once (rate limited), then falls back to unknown_champion.
+    """
+    champion = (await get_catalog(region)).by_key.get(champion_key)
+    if champion is None and time.time() - _unknown_champion_refreshes.get(region, 0) > unknown_champion_refresh_interval:
+        _unknown_champion_refreshes[region] = time.time()
+        try:
+            champion = (await refresh_catalog(region)).by_key.get(champion_key)
+        except Exception as e:
+            print(f'Could not refresh the {region} champion catalog: {e}', file=sys.stderr)
+    if champion is None:
+        champion = unknown_champion(champion_key)
+    return champion
+
+
+@tasks.loop(seconds=catalog_ttl)
+async def catalog_refresh_loop():
+    for region in set(_region_versions) | {default_region}:
+        try:
+            await refresh_catalog(region)
+        except Exception as e:
+            # keep serving the catalog we already have
+            print(f'Could not refresh the {region} champion catalog: {e}', file=sys.stderr)
+
+
+def start_catalog_refresh():
+    if not catalog_refresh_loop.is_running():
+        catalog_refresh_loop.start()
+
+# *********************************************************************************************************************
+# local data dragon mirror (per champion detail files)
+# *********************************************************************************************************************
+def get_mirror_path(version, champion_id=None):
+    if champion_id is None:
+        return f'{ddragon_mirror_directory}/{version}'
+    return f'{ddragon_mirror_directory}/{version}/champion/{champion_id}.json'
+
+
+def get_mirror_index(version):
+    # one directory scan per patch, after that the set is kept up to date on every download
+    if version not in _mirror_index:
+        champion_directory = get_mirror_path(version) + '/champion'
+        if os.path.isdir(champion_directory):
+            _mirror_index[version] = {entry.name[:-5] for entry in os.scandir(champion_directory)
+                                      if entry.name.endswith('.json')}
+        else:
+            _mirror_index[version] = set()
+    return _mirror_index[version]
+
+
+def read_mirrored_champion(version, champion_id):
+    with open(get_mirror_path(version, champion_id), 'r') as f:
+        return json.load(f)
+
+
+def write_mirrored_champion(version, champion_id, champion_detail):
+    path = get_mirror_path(version, champion_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    files.atomic_write(path, json.dumps(champion_detail))
+    get_mirror_index(version).add(champion_id)
+
+
+async def get_champion_detail(version, champion_id):
+    # full champion info (spells, skins, ...) served from the local mirror, downloaded on first use
+    if champion_id in get_mirror_index(version):
+        try:
+            return read_mirrored_champion(version, champion_id)
+        except (OSError, ValueError):
+            # file was removed or corrupted, fetch it again
+            get_mirror_index(version).discard(champion_id)
+    champion_detail = (await riot_api.data_dragon_champion(version, champion_id))['data'][champion_id]
+    write_mirrored_champion(version, champion_id, champion_detail)
+    return champion_detail
+
+
+async def prefetch_champion_details(version, champion_ids):
+    download_slots = asyncio.Semaphore(ddragon_prefetch_limit)
+
+    async def prefetch(champion_id):
+        async with download_slots:
+            try:
+                await get_champion_detail(version, champion_id)
+            except Exception as e:
+                print(f'Could not mirror {champion_id} ({version}): {e}', file=sys.stderr)
 
+    await asyncio.gather(*[prefetch(champion_id) for champion_id in champion_ids
+                           if champion_id not in get_mirror_index(version)])
 
-def get_version(region=default_region):
-    return lol_watcher.data_dragon.versions_for_region(region)
 
+def evict_old_mirrors():
+    # drop the mirrored patches no region is using anymore
+    if not os.path.isdir(ddragon_mirror_directory):
+        return
+    current_versions = set(_region_versions.values())
+    for entry in os.scandir(ddragon_mirror_directory):
+        if entry.is_dir() and entry.name not in current_versions:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            _mirror_index.pop(entry.name, None)
 
-def get_champion_list(champions_version=get_version(default_region)):
-    return lol_watcher.data_dragon.champions(champions_version)
 
 # def get_summoner_match_history_20(summoner_id):
 
 
-def champion_string_formatting(champion):
-    return champion.replace("'", '').lower().title().replace(' ', '').strip('"')
+def normalize_champion_name(champion):
+    # "Kai'Sa", "kaisa" and "Kai Sa" all become "kaisa"
+    return ''.join(c for c in champion.lower() if c.isalnum())
 
 
 def champion_url_by_name(champ_name):
@@ -0,0 +1,141 @@
+# *********************************************************************************************************************
+# riot_api.py
+# import cogs.helper.api.riot_api as riot_api
+# *********************************************************************************************************************
+
+import os
+import asyncio
+import aiohttp
+
+from urllib.parse import quote
+from dotenv import load_dotenv
+
+# get riot_lol_key from .env file
+load_dotenv()
+LOL_KEY = os.getenv('RIOT_LOL_KEY')
+default_region = 'na1'
+
+# connection pool settings (shared by every cog)
+connection_limit = 20
+request_timeout = aiohttp.ClientTimeout(total=10)
+rate_limit_retries = 3
+
+ddragon_url = 'https://ddragon.leagueoflegends.com'
+# data dragon realms are named differently than the riot platform regions
+ddragon_realms = {'br1': 'br', 'eun1': 'eune', 'euw1': 'euw', 'jp1': 'jp', 'kr': 'kr', 'la1': 'lan',
+                  'la2': 'las', 'na1': 'na', 'oc1': 'oce', 'tr1': 'tr', 'ru': 'ru'}
+
+_session = None
+
+
+class ApiError(Exception):
+    """Raised when the Riot API or data dragon answers with an error status (status is None when it didn't answer)."""
+
+    def __init__(self, status, url, reason=None):
+        if reason is None:
+            super().__init__(f'Riot API returned {status} for {url}')
+        else:
+            super().__init__(f'Riot API request to {url} failed: {reason}')
+        self.status = status
+        self.url = url
+
+
+# *********************************************************************************************************************
+# session helpers
+# *********************************************************************************************************************
+def get_session():
+    # lazily create one pooled session, must be called from inside the running event loop
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=connection_limit),
+                                         timeout=request_timeout)
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def get_json(url, headers=None):
+    session = get_session()
+    for attempt in range(rate_limit_retries + 1):
+        try:
+            async with session.get(url, headers=headers) as response:
+                # respect riot's rate limiting instead of failing the command straight away
+                if response.status == 429 and attempt < rate_limit_retries:
+                    retry_after = float(response.headers.get('Retry-After', 1))
+                elif response.status >= 400:
+                    raise ApiError(response.status, url)
+                else:
+                    return await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # connection errors and timeouts fail the same way an error status does
+            raise ApiError(None, url, str(e) or type(e).__name__) from e
+        await asyncio.sleep(retry_after)
+
+
+async def riot_get(region, path):
+    return await get_json(f'https://{region}.api.riotgames.com{path}', headers={'X-Riot-Token': LOL_KEY})
+
+
+# *********************************************************************************************************************
+# summoner
+# *********************************************************************************************************************
+async def summoner_by_name(region, summoner_name):
+    return await riot_get(region, f'/lol/summoner/v4/summoners/by-name/{quote(summoner_name)}')
+
+
+# *********************************************************************************************************************
+# league
+# *********************************************************************************************************************
+async def league_by_summoner(region, encrypted_summoner_id):
+    return await riot_get(region, f'/lol/league/v4/entries/by-summoner/{encrypted_summoner_id}')
+
+
+# *********************************************************************************************************************
+# champion mastery
+# *********************************************************************************************************************
+async def champion_mastery_by_summoner(region, encrypted_summoner_id):
+    return await riot_get(region, f'/lol/champion-mastery/v4/champion-masteries/by-summoner/{encrypted_summoner_id}')
+
+
+async def champion_mastery_by_summoner_by_champion(region, encrypted_summoner_id, champion_id):
+    return await riot_get(region, f'/lol/champion-mastery/v4/champion-masteries/by-summoner/{encrypted_summoner_id}'
+                                  f'/by-champion/{champion_id}')
+
+
+async def champion_mastery_scores_by_summoner(region, encrypted_summoner_id):
+    return await riot_get(region, f'/lol/champion-mastery/v4/scores/by-summoner/{encrypted_summoner_id}')
+
+
+# *********************************************************************************************************************
+# spectator
+# *********************************************************************************************************************
+async def spectator_by_summoner(region, encrypted_summoner_id):
+    return await riot_get(region, f'/lol/spectator/v4/active-games/by-summoner/{encrypted_summoner_id}')
+
+
+# *********************************************************************************************************************
+# clash
+# *********************************************************************************************************************
+async def clash_tournaments(region):
+    return await riot_get(region, '/lol/clash/v1/tournaments')
+
+
+# *********************************************************************************************************************
+# data dragon
+# *********************************************************************************************************************
+async def data_dragon_versions_for_region(region=default_region):
+    return await get_json(f'{ddragon_url}/realms/{ddragon_realms.get(region, region)}.json')
+
+
+async def data_dragon_champions(version, full=False, locale='en_US'):
+    champion_file = 'championFull' if full else 'champion'
+    return await get_json(f'{ddragon_url}/cdn/{version}/data/{locale}/{champion_file}.json')
+
+
+async def data_dragon_champion(version, champion, locale='en_US'):
+    return await get_json(f'{ddragon_url}/cdn/{version}/data/{locale}/champion/{champion}.json')
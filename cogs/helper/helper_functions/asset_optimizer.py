@@ -0,0 +1,170 @@
+# *********************************************************************************************************************
+# asset_optimizer.py
+# import cogs.helper.helper_functions.asset_optimizer as asset_optimizer
+#
+# build smaller copies of the reaction images and the manifest the response commands read:
+# $ python3 -m cogs.helper.helper_functions.asset_optimizer [--webp] [--max-bytes 8000000] [--max-dimension 480]
+# *********************************************************************************************************************
+
+import os
+import sys
+import json
+import argparse
+import mimetypes
+import cogs.helper.helper_functions.assets as assets
+import cogs.helper.helper_functions.files as files
+
+from PIL import Image, ImageSequence
+
+optimized_directory = assets.optimized_directory
+manifest_path = assets.manifest_path
+
+# discord's upload limit without boosts
+default_max_bytes = 8 * 1024 * 1024
+# embeds are shown at most ~400px wide, anything bigger is wasted bytes
+default_max_dimension = 480
+
+
+# *********************************************************************************************************************
+# helpers
+# *********************************************************************************************************************
+def relative_path(path):
+    return os.path.relpath(path, assets.resources_directory)
+
+
+def fit_size(size, max_dimension):
+    # scale down (never up) so the biggest side is at most max_dimension
+    scale = min(1, max_dimension / max(size))
+    return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
+
+def load_frames(image, max_dimension):
+    # returns [(frame, duration)] with identical consecutive frames merged into one longer frame
+    frames = []
+    previous = None
+    size = fit_size(image.size, max_dimension)
+    for frame in ImageSequence.Iterator(image):
+        duration = frame.info.get('duration', image.info.get('duration', 100))
+        frame = frame.convert('RGBA')
+        if frame.size != size:
+            frame = frame.resize(size, Image.LANCZOS)
+        data = frame.tobytes()
+        if data == previous:
+            frames[-1][1] += duration
+            continue
+        frames.append([frame, duration])
+        previous = data
+    return frames
+
+
+# *********************************************************************************************************************
+# variants
+# *********************************************************************************************************************
+def write_gif(image, path, max_dimension):
+    frames = load_frames(image, max_dimension)
+    first, *rest = [frame for frame, _ in frames]
+    first.save(path, 'GIF', save_all=True, append_images=rest, duration=[duration for _, duration in frames],
+               loop=image.info.get('loop', 0), optimize=True, disposal=2)
+
+
+def to_palette(image):
+    # a palette image when that loses nothing (opaque, 256 colours or less and every pixel unchanged), otherwise None
+    if image.getextrema()[3] != (255, 255) or image.getcolors(256) is None:
+        return None
+    rgb = image.convert('RGB')
+    palette = rgb.convert('P', palette=Image.ADAPTIVE, colors=256)
+    if palette.convert('RGB').tobytes() != rgb.tobytes():
+        return None
+    return palette
+
+
+def write_png(image, path, max_dimension):
+    image = image.convert('RGBA')
+    size = fit_size(image.size, max_dimension)
+    if image.size != size:
+        image = image.resize(size, Image.LANCZOS)
+    palette = to_palette(image)
+    if palette is not None:
+        image = palette
+    image.save(path, 'PNG', optimize=True)
+
+
+def write_jpeg(image, path, max_dimension):
+    # photos stay photos, a png of a jpeg is always bigger than the jpeg
+    image = image.convert('RGB')
+    size = fit_size(image.size, max_dimension)
+    if image.size != size:
+        image = image.resize(size, Image.LANCZOS)
+    image.save(path, 'JPEG', quality=85, optimize=True, progressive=True)
+
+
+def write_webp(image, path, max_dimension):
+    frames = load_frames(image, max_dimension)
+    first, *rest = [frame for frame, _ in frames]
+    first.save(path, 'WEBP', save_all=True, append_images=rest, duration=[duration for _, duration in frames],
+               loop=image.info.get('loop', 0), quality=90, method=6)
+
+
+# image format -> (variant extension, writer), anything else is written as a png
+format_writers = {
+    'GIF': ('gif', write_gif),
+    'JPEG': ('jpg', write_jpeg),
+}
+
+
+def build_variants(source_path, category, webp, max_bytes, max_dimension):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    variants = []
+    source_size = os.path.getsize(source_path)
+    with Image.open(source_path) as image:
+        # the file extension can lie (most of the .png reaction images are jpegs), the content can't
+        writers = [format_writers.get(image.format, ('png', write_png))]
+        if webp:
+            writers.append(('webp', write_webp))
+        for variant_extension, writer in writers:
+            path = f'{optimized_directory}/{category}/{stem}.{variant_extension}'
+            writer(image, path, max_dimension)
+            size = os.path.getsize(path)
+            # a variant is only worth keeping when it actually saves bytes and can be uploaded
+            if size >= source_size or size > max_bytes:
+                os.remove(path)
+                continue
+            with Image.open(path) as variant:
+                width, height = variant.size
+            variants.append({'path': relative_path(path), 'size': size, 'width': width, 'height': height,
+                             'mime_type': mimetypes.guess_type(path)[0]})
+    return sorted(variants, key=lambda variant: variant['size'])
+
+
+# *********************************************************************************************************************
+# manifest
+# *********************************************************************************************************************
+def optimize_assets(webp=False, max_bytes=default_max_bytes, max_dimension=default_max_dimension):
+    assets.refresh_assets()
+    manifest = {}
+    for category in assets.image_categories:
+        os.makedirs(f'{optimized_directory}/{category}', exist_ok=True)
+        for asset in assets.get_images(category):
+            try:
+                variants = build_variants(asset.path, category, webp, max_bytes, max_dimension)
+            except (OSError, ValueError) as e:
+                print(f'Could not optimize {asset.path}: {e}', file=sys.stderr)
+                continue
+            manifest[relative_path(asset.path)] = {'size': asset.size,
+                                                   'mtime': os.path.getmtime(asset.path),
+                                                   'variants': variants}
+            saved = asset.size - variants[0]['size'] if variants else 0
+            print(f'{relative_path(asset.path)}: {len(variants)} variant(s), {saved} bytes saved')
+    files.atomic_write(manifest_path, json.dumps(manifest, indent=2))
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build optimized copies of the reaction images.')
+    parser.add_argument('--webp', action='store_true', help='also build (animated) webp variants')
+    parser.add_argument('--max-bytes', type=int, default=default_max_bytes,
+                        help='skip variants bigger than this')
+    parser.add_argument('--max-dimension', type=int, default=default_max_dimension,
+                        help='scale images down so their biggest side fits')
+    args = parser.parse_args()
+    optimize_assets(args.webp, args.max_bytes, args.max_dimension)
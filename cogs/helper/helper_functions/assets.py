@@ -0,0 +1,159 @@
+# *********************************************************************************************************************
+# assets.py
+# import cogs.helper.helper_functions.assets as assets
+# *********************************************************************************************************************
+
+import os
+import sys
+import json
+import random
+import mimetypes
+
+from discord.ext import tasks
+
+# get current directory
+current_directory = os.path.dirname(os.path.realpath(__file__))
+resources_directory = "/".join(list(current_directory.split('/')
+                                    [0:-3])) + '/resource_files'
+
+# category -> image directory
+image_categories = {
+    'bee_facts': resources_directory + '/image_files/bee_facts_images',
+    'happy': resources_directory + '/image_files/happy_images',
+    'sad': resources_directory + '/image_files/sad_images',
+    'angry': resources_directory + '/image_files/angry_images',
+}
+# category -> text file (one entry per line)
+text_categories = {
+    'bee_facts': resources_directory + '/text_files/bee_facts.txt',
+}
+
+# smaller variants built by asset_optimizer.py (optional, the original files are sent without them)
+optimized_directory = resources_directory + '/optimized_images'
+manifest_path = optimized_directory + '/manifest.json'
+
+# how often to check the asset directories for changes (seconds)
+asset_refresh_interval = 60
+
+# category -> list of Asset / list of lines, path -> mtime it was indexed at
+_images = {}
+_texts = {}
+_mtimes = {}
+# source path (relative to resource_files) -> manifest entry
+_manifest = {}
+
+
+class Asset:
+    """One image file, indexed once so picking one never touches the filesystem.
+    upload_* is what gets sent: the smallest optimized variant if there is one, otherwise the file itself.
+    """
+    __slots__ = ('path', 'filename', 'size', 'mime_type', 'upload_path', 'upload_size', 'upload_mime_type')
+
+    def __init__(self, path, size, mtime=None):
+        self.path = path
+        self.filename = os.path.basename(path)
+        self.size = size
+        self.mime_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.upload_path, self.upload_size, self.upload_mime_type = path, size, self.mime_type
+        variant = get_best_variant(path, size, mtime)
+        if variant is not None:
+            self.upload_path = resources_directory + '/' + variant['path']
+            self.upload_size = variant['size']
+            self.upload_mime_type = variant['mime_type']
+
+    @property
+    def upload_filename(self):
+        # what the attachment is called, the extension has to match the variant that's sent
+        return 'image' + os.path.splitext(self.upload_path)[1]
+
+
+# *********************************************************************************************************************
+# index building
+# *********************************************************************************************************************
+def get_best_variant(path, size, mtime):
+    # the manifest's variants are sorted smallest first, skip them all if the original changed since
+    entry = _manifest.get(os.path.relpath(path, resources_directory))
+    if entry is None or entry['size'] != size or entry['mtime'] != mtime:
+        return None
+    for variant in entry['variants']:
+        if os.path.isfile(resources_directory + '/' + variant['path']):
+            return variant
+    return None
+
+
+def load_manifest():
+    global _manifest
+    try:
+        mtime = os.stat(manifest_path).st_mtime
+    except OSError:
+        mtime = None
+    if _mtimes.get(manifest_path) == mtime:
+        return False
+    try:
+        with open(manifest_path, 'r') as f:
+            _manifest = json.load(f)
+    except (OSError, ValueError):
+        _manifest = {}
+    _mtimes[manifest_path] = mtime
+    return True
+
+
+def index_images(directory):
+    return [Asset(entry.path, stat.st_size, stat.st_mtime)
+            for entry in sorted(os.scandir(directory), key=lambda e: e.name) if entry.is_file()
+            for stat in (entry.stat(),)]
+
+
+def index_lines(path):
+    with open(path, 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def refresh_assets():
+    # a new manifest means every image may have a different best variant
+    if load_manifest():
+        _images.clear()
+    # only re-index what changed since the last check (a directory's mtime changes when files are added/removed)
+    for categories, index, build in ((image_categories, _images, index_images),
+                                     (text_categories, _texts, index_lines)):
+        for category, path in categories.items():
+            try:
+                mtime = os.stat(path).st_mtime
+                if _mtimes.get(path) != mtime or category not in index:
+                    index[category] = build(path)
+                    _mtimes[path] = mtime
+            except OSError as e:
+                # keep serving what was indexed before
+                print(f'Could not index {path}: {e}', file=sys.stderr)
+                index.setdefault(category, [])
+
+
+@tasks.loop(seconds=asset_refresh_interval)
+async def asset_refresh_loop():
+    refresh_assets()
+
+
+def start_asset_refresh():
+    if not _images:
+        refresh_assets()
+    if not asset_refresh_loop.is_running():
+        asset_refresh_loop.start()
+
+
+# *********************************************************************************************************************
+# random picks
+# *********************************************************************************************************************
+def get_images(category):
+    return _images.get(category, [])
+
+
+def get_lines(category):
+    return _texts.get(category, [])
+
+
+def random_image(category):
+    return random.choice(get_images(category))
+
+
+def random_line(category):
+    return random.choice(get_lines(category))
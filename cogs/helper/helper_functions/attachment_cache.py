@@ -0,0 +1,81 @@
+# *********************************************************************************************************************
+# attachment_cache.py
+# import cogs.helper.helper_functions.attachment_cache as attachment_cache
+# *********************************************************************************************************************
+
+import os
+import time
+import hashlib
+import discord
+
+from urllib.parse import urlparse, parse_qs
+
+# cdn urls without an expiry ('ex' parameter) are still only trusted for this long (seconds)
+cdn_url_max_age = 12 * 3600
+# stop reusing a url a bit before discord expires it
+cdn_url_expiry_margin = 300
+
+# path -> (mtime, size, content hash)
+_hashes = {}
+# content hash -> (cdn url, expires at, message id hosting the upload)
+_urls = {}
+
+
+def get_content_hash(path):
+    # only re-hash a file when it changed on disk
+    stat = os.stat(path)
+    cached = _hashes.get(path)
+    if cached is None or cached[:2] != (stat.st_mtime, stat.st_size):
+        with open(path, 'rb') as f:
+            cached = (stat.st_mtime, stat.st_size, hashlib.sha256(f.read()).hexdigest())
+        _hashes[path] = cached
+    return cached[2]
+
+
+def get_url_expiry(url):
+    # discord signs cdn urls with an 'ex' parameter (hex unix timestamp)
+    expiry = parse_qs(urlparse(url).query).get('ex')
+    if expiry:
+        try:
+            return int(expiry[0], 16) - cdn_url_expiry_margin
+        except ValueError:
+            pass
+    return time.time() + cdn_url_max_age
+
+
+def get_cdn_url(content_hash):
+    cached = _urls.get(content_hash)
+    if cached is None:
+        return None
+    if cached[1] <= time.time():
+        _urls.pop(content_hash)
+        return None
+    return cached[0]
+
+
+def forget_message(message_id):
+    # the upload goes away with its message, so its url can't be reused anymore
+    for content_hash, cached in list(_urls.items()):
+        if cached[2] == message_id:
+            _urls.pop(content_hash)
+
+
+async def send_embed_with_file(destination, embed, path, filename='image.png', thumbnail=False, extra_files=(),
+                               **kwargs):
+    """Send an embed showing a local image, uploading the image only the first time.
+    Later sends point the embed at the cdn url of that first upload (until it expires or its message is deleted).
+    extra_files (ex: a generated image) are uploaded with every send.
+    """
+    set_embed_url = embed.set_thumbnail if thumbnail else embed.set_image
+    content_hash = get_content_hash(path)
+    cdn_url = get_cdn_url(content_hash)
+    if cdn_url is not None:
+        set_embed_url(url=cdn_url)
+        return await destination.send(embed=embed, files=list(extra_files) or None, **kwargs)
+    set_embed_url(url=f'attachment://{filename}')
+    # the cached image goes first, so it's attachments[0]
+    msg = await destination.send(files=[discord.File(path, filename=filename), *extra_files], embed=embed, **kwargs)
+    if msg.attachments:
+        cdn_url = msg.attachments[0].url
+        _urls[content_hash] = (cdn_url, get_url_expiry(cdn_url), msg.id)
+    return msg
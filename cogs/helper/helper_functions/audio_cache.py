@@ -0,0 +1,148 @@
+# *********************************************************************************************************************
+# audio_cache.py
+# import cogs.helper.helper_functions.audio_cache as audio_cache
+# *********************************************************************************************************************
+
+import os
+import sys
+import json
+import asyncio
+import hashlib
+import cogs.helper.helper_functions.ytdl_workers as ytdl_workers
+import cogs.helper.helper_functions.files as files
+
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+# get current directory
+current_directory = os.path.dirname(os.path.realpath(__file__))
+audio_cache_directory = "/".join(list(current_directory.split('/')
+                                 [0:-3])) + '/resource_files/audio_cache'
+audio_cache_index_path = audio_cache_directory + '/index.json'
+
+# keep frequently played songs on disk (set in .env)
+load_dotenv()
+audio_cache_enabled = os.getenv('BEEBOT_AUDIO_CACHE', 'false').lower() == 'true'
+audio_cache_max_bytes = int(os.getenv('BEEBOT_AUDIO_CACHE_MB', '1024')) * 1024 * 1024
+# a song is downloaded once it has been played this many times
+audio_cache_min_plays = 3
+# how many not yet cached songs have their plays counted (least recently played are forgotten)
+audio_cache_max_counted = 10000
+
+# webpage url -> Track, least recently played first
+_tracks = OrderedDict()
+# webpage url -> number of plays (songs not cached yet), least recently played first
+_plays = OrderedDict()
+# webpage urls being downloaded, and their tasks (kept referenced so they aren't garbage collected mid download)
+_downloading = set()
+_download_tasks = set()
+_loaded = False
+
+
+class Track:
+    """A song stored in the audio cache."""
+    __slots__ = ('webpage_url', 'path', 'size', 'acodec')
+
+    def __init__(self, webpage_url, path, size, acodec=None):
+        self.webpage_url = webpage_url
+        self.path = path
+        self.size = size
+        self.acodec = acodec
+
+
+# *********************************************************************************************************************
+# index
+# *********************************************************************************************************************
+def load_index():
+    # the index keeps the least recently played order (and codecs) across restarts
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    os.makedirs(audio_cache_directory, exist_ok=True)
+    try:
+        with open(audio_cache_index_path, 'r') as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        entries = []
+    for entry in entries:
+        path = f"{audio_cache_directory}/{entry['filename']}"
+        if os.path.isfile(path):
+            _tracks[entry['webpage_url']] = Track(entry['webpage_url'], path, os.path.getsize(path),
+                                                  entry.get('acodec'))
+
+
+def save_index():
+    entries = [{'webpage_url': track.webpage_url, 'filename': os.path.basename(track.path), 'acodec': track.acodec}
+               for track in _tracks.values()]
+    files.atomic_write(audio_cache_index_path, json.dumps(entries))
+
+
+def get_total_bytes():
+    return sum(track.size for track in _tracks.values())
+
+
+def evict(max_bytes=audio_cache_max_bytes):
+    # drop the least recently played songs until the cache fits
+    total_bytes = get_total_bytes()
+    while _tracks and total_bytes > max_bytes:
+        _, track = _tracks.popitem(last=False)
+        total_bytes -= track.size
+        try:
+            os.remove(track.path)
+        except OSError:
+            pass
+
+
+# *********************************************************************************************************************
+# lookups
+# *********************************************************************************************************************
+def get_track(webpage_url):
+    """The cached Track of a song (marked as just played), None when it isn't cached."""
+    if not audio_cache_enabled:
+        return None
+    load_index()
+    track = _tracks.get(webpage_url)
+    if track is None:
+        return None
+    if not os.path.isfile(track.path):
+        _tracks.pop(webpage_url)
+        return None
+    _tracks.move_to_end(webpage_url)
+    return track
+
+
+def record_play(webpage_url):
+    """Count a play, the song is downloaded in the background once it's played often enough."""
+    if not audio_cache_enabled or webpage_url is None:
+        return
+    load_index()
+    if webpage_url in _tracks or webpage_url in _downloading:
+        return
+    _plays[webpage_url] = _plays.get(webpage_url, 0) + 1
+    _plays.move_to_end(webpage_url)
+    while len(_plays) > audio_cache_max_counted:
+        _plays.popitem(last=False)
+    if _plays[webpage_url] >= audio_cache_min_plays:
+        _downloading.add(webpage_url)
+        task = asyncio.ensure_future(download_track(webpage_url))
+        _download_tasks.add(task)
+        task.add_done_callback(_download_tasks.discard)
+
+
+async def download_track(webpage_url):
+    # downloads run one at a time on their own worker process, so they never hold up a guild's song lookups
+    key = hashlib.sha1(webpage_url.encode()).hexdigest()
+    try:
+        path, acodec = await ytdl_workers.download(
+            webpage_url, f'{audio_cache_directory}/{key}.%(ext)s')
+        _tracks[webpage_url] = Track(webpage_url, path, os.path.getsize(path), acodec)
+        _plays.pop(webpage_url, None)
+        evict()
+        save_index()
+    except Exception as e:
+        # streaming keeps working, try again after the next plays
+        _plays.pop(webpage_url, None)
+        print(f'Could not cache {webpage_url}: {e}', file=sys.stderr)
+    finally:
+        _downloading.discard(webpage_url)
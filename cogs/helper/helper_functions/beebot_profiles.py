@@ -3,24 +3,24 @@
 # import cogs.helper.helper_functions.beebot_profiles as beebot_profiles
 # *********************************************************************************************************************
 
-import os
-import json
+import cogs.helper.helper_functions.document_store as document_store
 
-# get current directory
-current_directory = os.path.dirname(os.path.realpath(__file__))
-beebot_profiles_json = "/".join(list(current_directory.split('/')
-                                     [0:-3])) + '/resource_files/json_files/beebot_profiles.json'
+# beebot_profiles are read once and written back in batches (json file or sqlite, see storage_backends.py)
+beebot_profiles_store = document_store.DocumentStore('beebot_profiles')
 
 
 def get_beebot_profiles_json():
-    with open(beebot_profiles_json, "r") as f:
-        beebot_profiles = json.load(f)
-    return beebot_profiles
+    # returns the live in-memory beebot_profiles, save changes with set_beebot_profiles_json
+    return beebot_profiles_store.get()
 
 
 def set_beebot_profiles_json(data):
-    with open(beebot_profiles_json, 'w') as outfile:
-        json.dump(data, outfile)
+    beebot_profiles_store.set(data)
+
+
+def transaction(*discord_usernames):
+    # async with beebot_profiles.transaction(discord_username) as beebot_profiles_data:
+    return beebot_profiles_store.transaction(*[(discord_username,) for discord_username in discord_usernames])
 
 
 def beebot_profile_exists(beebot_profiles_data, discord_username):
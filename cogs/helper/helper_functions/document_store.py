@@ -0,0 +1,139 @@
+# *********************************************************************************************************************
+# document_store.py
+# import cogs.helper.helper_functions.document_store as document_store
+# *********************************************************************************************************************
+
+import sys
+import atexit
+import weakref
+import asyncio
+import contextlib
+import cogs.helper.helper_functions.storage_backends as storage_backends
+
+# seconds to wait before writing changes, every change made in that window is written at once
+flush_delay = 5
+
+# every store created, so they can all be flushed on shutdown
+_stores = []
+
+
+class KeyLock:
+    """Shared/exclusive lock guarding one key of a document (and everything below it)."""
+
+    def __init__(self):
+        self._readers = 0
+        self._writer = False
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, exclusive):
+        async with self._condition:
+            if exclusive:
+                await self._condition.wait_for(lambda: not self._writer and not self._readers)
+                self._writer = True
+            else:
+                await self._condition.wait_for(lambda: not self._writer)
+                self._readers += 1
+
+    async def release(self, exclusive):
+        async with self._condition:
+            if exclusive:
+                self._writer = False
+            else:
+                self._readers -= 1
+            self._condition.notify_all()
+
+
+class DocumentStore:
+    """In-memory copy of a named document that is loaded once and written back in batches.
+    get() hands out the live document, callers mutate it and call set()/mark_dirty() to have it saved.
+    Where the document lives (json file, sqlite, ...) is up to the storage backend.
+    """
+
+    def __init__(self, name, backend=None, delay=flush_delay):
+        self.name = name
+        self.backend = backend or storage_backends.get_backend()
+        self.delay = delay
+        self._data = None
+        self._dirty = False
+        self._flush_handle = None
+        # key path -> KeyLock, dropped again once no transaction uses it
+        self._locks = weakref.WeakValueDictionary()
+        _stores.append(self)
+
+    def get(self):
+        if self._data is None:
+            self._data = self.load()
+        return self._data
+
+    def set(self, data):
+        self._data = data
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        self._dirty = True
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # not running inside the bot (ex: scripts), write straight away
+            return self.flush()
+        self._flush_handle = loop.call_later(self.delay, self.flush)
+
+    @contextlib.asynccontextmanager
+    async def transaction(self, *keys):
+        """async with store.transaction(('giveaways', message_id)) as data:
+        Keys are paths into the document. Transactions on different keys run side by side, transactions on
+        the same key (or on a key and one of its parents) wait for each other. No keys locks the whole document.
+        The block edits the live document in place and there is no rollback: changes made before an exception stay
+        in memory and are written with the next save. A block that finishes is marked dirty and saved.
+        """
+        # every parent of a key is locked shared, the key itself exclusive
+        modes = {(): False}
+        for key in keys:
+            key = key if isinstance(key, tuple) else (key,)
+            for depth in range(1, len(key)):
+                modes.setdefault(key[:depth], False)
+            modes[key] = True
+        if not keys:
+            modes[()] = True
+        # always lock in the same (sorted) order so two transactions can't deadlock
+        held = []
+        try:
+            for path in sorted(modes, key=lambda path: tuple(map(str, path))):
+                lock = self._locks.get(path)
+                if lock is None:
+                    lock = self._locks[path] = KeyLock()
+                await lock.acquire(modes[path])
+                held.append((lock, modes[path]))
+            yield self.get()
+            self.mark_dirty()
+        finally:
+            for lock, exclusive in reversed(held):
+                await lock.release(exclusive)
+
+    def load(self):
+        return self.backend.load(self.name)
+
+    def flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._dirty:
+            return
+        try:
+            self.backend.save(self.name, self._data)
+        except Exception as e:
+            # stay dirty, the next change tries again
+            print(f'Could not save {self.name}: {e}', file=sys.stderr)
+            return
+        self._dirty = False
+
+
+def flush_all():
+    for store in _stores:
+        store.flush()
+
+
+# write any pending changes when BeeBot shuts down
+atexit.register(flush_all)
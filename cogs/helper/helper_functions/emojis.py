@@ -18,9 +18,34 @@ def get_full_emojis_list():
     return emojis_list
 
 
+def build_emoji_index(emojis_list):
+    # emoji -> entry, alias -> emoji, tag -> emojis
+    by_emoji = {}
+    by_alias = {}
+    by_tag = {}
+    for entry in emojis_list:
+        by_emoji[entry['emoji']] = entry
+        for alias in entry.get('aliases', []):
+            by_alias.setdefault(alias, entry['emoji'])
+        for tag in entry.get('tags', []):
+            by_tag.setdefault(tag, []).append(entry['emoji'])
+    return by_emoji, by_alias, {tag: tuple(tag_emojis) for tag, tag_emojis in by_tag.items()}
+
+
+# the catalog never changes while BeeBot runs, so it is loaded and indexed once
+emojis_by_emoji, emojis_by_alias, emojis_by_tag = build_emoji_index(
+    get_full_emojis_list())
+emoji_set = frozenset(emojis_by_emoji)
+
+
 def check_emoji(emoji):
-    emojis_list = get_full_emojis_list()
-    if any(d['emoji'] == emoji for d in emojis_list):
-        return True
-    else:
-        return False
+    return emoji in emoji_set
+
+
+def resolve_alias(alias):
+    # ':grinning:' or 'grinning' -> '😀', None if the alias doesn't exist
+    return emojis_by_alias.get(alias.strip(':'))
+
+
+def get_emojis_by_tag(tag):
+    return emojis_by_tag.get(tag, ())
@@ -3,24 +3,35 @@
 # import cogs.helper.helper_functions.events as events
 # *********************************************************************************************************************
 
-import os
-import json
+import cogs.helper.helper_functions.document_store as document_store
 
-# get current directory
-current_directory = os.path.dirname(os.path.realpath(__file__))
-events_json = "/".join(list(current_directory.split('/')
-                            [0:-3])) + '/resource_files/json_files/events.json'
+# events are read once and written back in batches (json file or sqlite, see storage_backends.py)
+events_store = document_store.DocumentStore('events')
 
 
 def get_events_json():
-    with open(events_json, "r") as f:
-        events = json.load(f)
-    return events
+    # returns the live in-memory events, save changes with set_events_json
+    return events_store.get()
 
 
 def set_events_json(data):
-    with open(events_json, 'w') as outfile:
-        json.dump(data, outfile)
+    events_store.set(data)
+
+
+def transaction(*keys):
+    # async with events.transaction(events.giveaway_key(message_id)) as events_data:
+    return events_store.transaction(*keys)
+
+
+def giveaway_key(message_id):
+    return ('giveaways', str(message_id))
+
+
+def clash_key(discord_username=None):
+    # without a username the whole clash event is locked (ex: setting up the next clash)
+    if discord_username is None:
+        return ('clash',)
+    return ('clash', discord_username)
 
 
 def event_exists(events_data, event):
@@ -0,0 +1,22 @@
+# *********************************************************************************************************************
+# files.py
+# import cogs.helper.helper_functions.files as files
+# *********************************************************************************************************************
+
+import os
+import tempfile
+
+
+def atomic_write(path, data, mode='w'):
+    """Write data (str, or bytes with mode='wb') to path through a temp file in the same directory and a rename,
+    so readers (and a crash mid write) never see a half written file."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.',
+                                     suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as outfile:
+            outfile.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.isfile(temp_path):
+            os.remove(temp_path)
+        raise
@@ -4,16 +4,38 @@
 # *********************************************************************************************************************
 
 import os
+import asyncio
+import hashlib
+import functools
 import requests
+import cogs.helper.api.riot_api as riot_api
+import cogs.helper.helper_functions.files as files
 from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from PIL import Image
+from dotenv import load_dotenv
 
 # get current directory
 current_directory = os.path.dirname(os.path.realpath(__file__))
 images_directory = "/".join(list(current_directory.split('/')
                             [0:-3])) + '/resource_files/image_files/'
 
+# decoded images kept in memory (bytes of pixel data)
+image_cache_max_bytes = 64 * 1024 * 1024
+# also keep fetched images on disk across restarts (set in .env)
+load_dotenv()
+image_disk_cache = os.getenv('BEEBOT_IMAGE_DISK_CACHE', 'false').lower() == 'true'
+image_disk_cache_directory = "/".join(list(current_directory.split('/')
+                                      [0:-3])) + '/resource_files/image_cache'
+# threads for pillow work (pillow releases the GIL while decoding/resizing/encoding)
+image_workers = 4
+
+_executor = None
+# (url, width, height) -> future of the fetch in flight
+_pending = {}
+
 
 def get_image_path(file_name):
     return images_directory + file_name
@@ -46,6 +68,213 @@ def resize_image(image, width, height):
     return image.resize((width, height))
 
 
+def render_sprite_grid(rows, icon_size, padding=2, background=(0, 0, 0, 0)):
+    # one canvas for the whole grid, every icon is pasted straight into its slot (None leaves the slot empty)
+    columns = max((len(row) for row in rows), default=0)
+    canvas = Image.new('RGBA', (max(1, columns * (icon_size + padding) - padding),
+                                max(1, len(rows) * (icon_size + padding) - padding)), background)
+    for row_index, row in enumerate(rows):
+        for column_index, icon in enumerate(row):
+            if icon is None:
+                continue
+            if icon.size != (icon_size, icon_size):
+                icon = resize_image(icon, icon_size, icon_size)
+            canvas.paste(icon, (column_index * (icon_size + padding), row_index * (icon_size + padding)),
+                         icon if icon.mode == 'RGBA' else None)
+    return canvas
+
+
+def open_image(path):
+    # Image.open is lazy, load the pixels here so it happens off the event loop
+    image = Image.open(path)
+    image.load()
+    return image
+
+
+# *********************************************************************************************************************
+# async wrappers (pillow work runs on the image threads, never on the event loop)
+# *********************************************************************************************************************
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=image_workers, thread_name_prefix='beebot-images')
+    return _executor
+
+
+async def run_in_image_thread(func, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def open_image_async(path):
+    return await run_in_image_thread(open_image, path)
+
+
+async def resize_image_async(image, width, height):
+    return await run_in_image_thread(resize_image, image, width, height)
+
+
+async def save_image_async(image, path):
+    return await run_in_image_thread(save_image, image, path)
+
+
+async def merge_images_width_wise_async(image1, image2, save_path, offset=0):
+    return await run_in_image_thread(merge_images_width_wise, image1, image2, save_path, offset)
+
+
+async def encode_image_async(image, format='PNG'):
+    return await run_in_image_thread(encode_image, image, format)
+
+
 def delete_image(path):
     if os.path.isfile(path):
         os.remove(path)
+
+
+# *********************************************************************************************************************
+# in-memory pipeline (nothing is written to disk, so concurrent commands can't clash)
+# *********************************************************************************************************************
+async def fetch_image_bytes(url):
+    # reuses the pooled aiohttp session instead of a blocking requests.get
+    async with riot_api.get_session().get(url) as response:
+        response.raise_for_status()
+        return await response.read()
+
+
+def encode_image(image, format='PNG'):
+    image_bytes = BytesIO()
+    image.save(image_bytes, format)
+    image_bytes.seek(0)
+    return image_bytes
+
+
+def decode_image(data, width=None, height=None):
+    image = Image.open(BytesIO(data))
+    if width is not None and height is not None:
+        return resize_image(image, width, height)
+    image.load()
+    return image
+
+
+async def get_resized_image(url, width=None, height=None):
+    """Fetched (and resized) Pillow image, served from the image cache when possible.
+    The image is shared with every other caller, so treat it as read-only (copy() it before drawing on it).
+    """
+    key = (url, width, height)
+    image = image_cache.get(key)
+    if image is not None:
+        return image
+    # concurrent requests for the same image (ex: the same icon twice in a grid) share one fetch
+    pending = _pending.get(key)
+    if pending is None:
+        pending = _pending[key] = asyncio.ensure_future(load_resized_image(key))
+        pending.add_done_callback(lambda _: _pending.pop(key, None))
+    # one caller giving up doesn't cancel it for the others
+    return await asyncio.shield(pending)
+
+
+async def load_resized_image(key):
+    url, width, height = key
+    image = None
+    if image_cache.directory is not None:
+        image = await run_in_image_thread(image_cache.read_disk, key)
+    if image is None:
+        image_cache.misses += 1
+        data = await fetch_image_bytes(url)
+        image = await run_in_image_thread(decode_image, data, width, height)
+        if image_cache.directory is not None:
+            await run_in_image_thread(image_cache.write_disk, key, image)
+    image_cache.put(key, image)
+    return image
+
+
+async def render_icon_grid(url_rows, icon_size=48, padding=2, format='PNG'):
+    """Fetch every icon (through the image cache) and render them as one grid, one row per list of urls.
+    Returns a BytesIO ready for discord.File, icons that couldn't be fetched (or whose url is None) are left blank.
+    """
+    async def fetch_icon(url):
+        return None if url is None else await get_resized_image(url, icon_size, icon_size)
+
+    urls = [url for row in url_rows for url in row]
+    icons = await asyncio.gather(*[fetch_icon(url) for url in urls], return_exceptions=True)
+    icons = iter([None if isinstance(icon, Exception) else icon for icon in icons])
+    rows = [[next(icons) for _ in row] for row in url_rows]
+
+    def render():
+        return encode_image(render_sprite_grid(rows, icon_size, padding), format)
+    return await run_in_image_thread(render)
+
+
+async def fetch_resized_image(url, width, height, format='PNG'):
+    # returns a BytesIO ready for discord.File, decoding/resizing/encoding runs in a worker thread
+    image = await get_resized_image(url, width, height)
+    return await encode_image_async(image, format)
+
+
+# *********************************************************************************************************************
+# ImageCache class
+# *********************************************************************************************************************
+def image_size_in_bytes(image):
+    return image.width * image.height * len(image.getbands())
+
+
+class ImageCache:
+    """LRU cache of decoded Pillow images keyed by (url, width, height), bounded by their size in memory.
+    With a directory set, images evicted from memory (or from a previous run) are read back from disk.
+    """
+
+    def __init__(self, max_bytes=image_cache_max_bytes, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._images = OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+            self.hits += 1
+        return image
+
+    def put(self, key, image):
+        size = image_size_in_bytes(image)
+        if size > self.max_bytes:
+            return
+        previous = self._images.pop(key, None)
+        if previous is not None:
+            self.current_bytes -= image_size_in_bytes(previous)
+        self._images[key] = image
+        self.current_bytes += size
+        # drop the least recently used images until it fits again
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._images.popitem(last=False)
+            self.current_bytes -= image_size_in_bytes(evicted)
+
+    def get_disk_path(self, key):
+        return f'{self.directory}/{hashlib.sha1(repr(key).encode()).hexdigest()}.png'
+
+    def read_disk(self, key):
+        try:
+            image = Image.open(self.get_disk_path(key))
+            image.load()
+        except (OSError, ValueError):
+            return None
+        self.disk_hits += 1
+        return image
+
+    def write_disk(self, key, image):
+        try:
+            files.atomic_write(self.get_disk_path(key), encode_image(image).getvalue(), 'wb')
+        except (OSError, ValueError):
+            pass
+
+    def stats(self):
+        return {'images': len(self._images), 'bytes': self.current_bytes, 'hits': self.hits,
+                'disk_hits': self.disk_hits, 'misses': self.misses}
+
+
+image_cache = ImageCache(directory=image_disk_cache_directory if image_disk_cache else None)
@@ -0,0 +1,192 @@
+# *********************************************************************************************************************
+# sqlite_backend.py
+# import cogs.helper.helper_functions.sqlite_backend as sqlite_backend
+#
+# one-shot import of the existing json files:
+# $ python3 -m cogs.helper.helper_functions.sqlite_backend
+# *********************************************************************************************************************
+
+import json
+import sqlite3
+import cogs.helper.helper_functions.storage_backends as storage_backends
+
+sqlite_path = storage_backends.resources_directory + '/beebot.db'
+
+schema = '''
+CREATE TABLE IF NOT EXISTS profiles (
+    discord_username TEXT PRIMARY KEY,
+    profile TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    event TEXT PRIMARY KEY,
+    details TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS giveaways (
+    message_id TEXT PRIMARY KEY,
+    giveaway_author TEXT NOT NULL,
+    title TEXT NOT NULL,
+    reaction TEXT NOT NULL,
+    start_time REAL NOT NULL,
+    details TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS giveaways_by_author_title ON giveaways (giveaway_author, title);
+CREATE TABLE IF NOT EXISTS giveaway_participants (
+    message_id TEXT NOT NULL REFERENCES giveaways (message_id),
+    user_id TEXT NOT NULL,
+    display_name TEXT NOT NULL,
+    PRIMARY KEY (message_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS clash_signups (
+    discord_username TEXT PRIMARY KEY,
+    sat INTEGER NOT NULL DEFAULT 0,
+    sun INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url_name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+'''
+
+# table -> (columns, number of leading columns making up the primary key)
+tables = {
+    'profiles': (('discord_username', 'profile'), 1),
+    'events': (('event', 'details'), 1),
+    'giveaways': (('message_id', 'giveaway_author', 'title', 'reaction', 'start_time', 'details'), 1),
+    'giveaway_participants': (('message_id', 'user_id', 'display_name'), 2),
+    'clash_signups': (('discord_username', 'sat', 'sun'), 1),
+    'urls': (('url_name', 'data'), 1),
+}
+
+# document -> tables it is split into (parents before children)
+document_tables = {
+    'beebot_profiles': ('profiles',),
+    'events': ('events', 'giveaways', 'giveaway_participants', 'clash_signups'),
+    'urls': ('urls',),
+}
+
+
+# *********************************************************************************************************************
+# document <-> rows
+# *********************************************************************************************************************
+def document_to_rows(name, data):
+    # returns {table: {primary key: row}}
+    rows = {table: {} for table in document_tables[name]}
+    if name == 'beebot_profiles':
+        for discord_username, profile in data.items():
+            rows['profiles'][(discord_username,)] = (discord_username, json.dumps(profile))
+    elif name == 'urls':
+        for url_name, url_data in data.items():
+            rows['urls'][(url_name,)] = (url_name, json.dumps(url_data))
+    elif name == 'events':
+        for event, details in data.items():
+            if event == 'giveaways':
+                for message_id, giveaway in details.items():
+                    message_id = str(message_id)
+                    giveaway_details = {k: v for k, v in giveaway.items() if k != 'participants'}
+                    rows['giveaways'][(message_id,)] = (message_id, giveaway['giveaway_author'], giveaway['title'],
+                                                        giveaway['reaction'], giveaway['start_time'],
+                                                        json.dumps(giveaway_details))
+                    for user_id, display_name in giveaway.get('participants', {}).items():
+                        rows['giveaway_participants'][(message_id, user_id)] = (message_id, user_id, display_name)
+                continue
+            if event == 'clash':
+                for discord_username, days in details.get('participants', {}).items():
+                    rows['clash_signups'][(discord_username,)] = (discord_username, days['Sat'], days['Sun'])
+                details = {k: v for k, v in details.items() if k != 'participants'}
+            rows['events'][(event,)] = (event, json.dumps(details))
+    return rows
+
+
+def rows_to_document(name, rows):
+    data = {}
+    if name == 'beebot_profiles':
+        for discord_username, profile in rows['profiles']:
+            data[discord_username] = json.loads(profile)
+    elif name == 'urls':
+        for url_name, url_data in rows['urls']:
+            data[url_name] = json.loads(url_data)
+    elif name == 'events':
+        for event, details in rows['events']:
+            data[event] = json.loads(details)
+        # a scheduled clash always carries its (maybe empty) participants, even when it has nothing else stored
+        if 'clash' in data:
+            data['clash']['participants'] = {
+                discord_username: {'Sat': sat, 'Sun': sun} for discord_username, sat, sun in rows['clash_signups']}
+        data['giveaways'] = {}
+        for row in rows['giveaways']:
+            giveaway = json.loads(row[-1])
+            giveaway['participants'] = {}
+            data['giveaways'][row[0]] = giveaway
+        for message_id, user_id, display_name in rows['giveaway_participants']:
+            if message_id in data['giveaways']:
+                data['giveaways'][message_id]['participants'][user_id] = display_name
+    return data
+
+
+# *********************************************************************************************************************
+# SqliteBackend class
+# *********************************************************************************************************************
+class SqliteBackend:
+    """Stores the documents in proper sqlite tables (WAL mode).
+    Only the rows that changed since the last save are written to the database. Every save still splits and compares
+    the whole document in python, only the database writes are incremental.
+    """
+
+    def __init__(self, path=sqlite_path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('PRAGMA foreign_keys=ON')
+        self.connection.executescript(schema)
+        # document -> rows as they are in the database, used to only write what changed
+        self._saved_rows = {}
+
+    def load(self, name):
+        rows = {}
+        for table in document_tables[name]:
+            columns, key_length = tables[table]
+            rows[table] = self.connection.execute(
+                f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid").fetchall()
+        self._saved_rows[name] = {table: {tuple(row[:tables[table][1]]): tuple(row) for row in table_rows}
+                                  for table, table_rows in rows.items()}
+        return rows_to_document(name, rows)
+
+    def save(self, name, data):
+        new_rows = document_to_rows(name, data)
+        if name not in self._saved_rows:
+            self.load(name)
+        saved_rows = self._saved_rows[name]
+        with self.connection:
+            # children are deleted before their parents, parents are written before their children
+            for table in reversed(document_tables[name]):
+                columns, key_length = tables[table]
+                removed = [key for key in saved_rows[table] if key not in new_rows[table]]
+                if removed:
+                    where = ' AND '.join(f'{column} = ?' for column in columns[:key_length])
+                    self.connection.executemany(f'DELETE FROM {table} WHERE {where}', removed)
+            for table in document_tables[name]:
+                columns, key_length = tables[table]
+                changed = [row for key, row in new_rows[table].items() if saved_rows[table].get(key) != row]
+                if changed:
+                    updates = ', '.join(f'{column} = excluded.{column}' for column in columns[key_length:])
+                    self.connection.executemany(
+                        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                        f"ON CONFLICT ({', '.join(columns[:key_length])}) DO UPDATE SET {updates}", changed)
+        self._saved_rows[name] = new_rows
+
+
+# *********************************************************************************************************************
+# one-shot importer from the existing json files
+# *********************************************************************************************************************
+def import_json_files(json_backend=None, sqlite_backend=None):
+    json_backend = json_backend or storage_backends.JsonBackend()
+    sqlite_backend = sqlite_backend or SqliteBackend()
+    for name in document_tables:
+        data = json_backend.load(name)
+        sqlite_backend.save(name, data)
+        print(f'Imported {name}.json ({len(data)} entries)')
+
+
+if __name__ == '__main__':
+    import_json_files()
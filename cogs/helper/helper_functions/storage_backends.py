@@ -0,0 +1,53 @@
+# *********************************************************************************************************************
+# storage_backends.py
+# import cogs.helper.helper_functions.storage_backends as storage_backends
+# *********************************************************************************************************************
+
+import os
+import json
+import cogs.helper.helper_functions.files as files
+
+from dotenv import load_dotenv
+
+# get current directory
+current_directory = os.path.dirname(os.path.realpath(__file__))
+resources_directory = "/".join(list(current_directory.split('/')
+                                    [0:-3])) + '/resource_files'
+json_files_directory = resources_directory + '/json_files'
+
+# pick the storage backend in the .env file (BEEBOT_STORAGE=json or BEEBOT_STORAGE=sqlite)
+load_dotenv()
+storage_backend = os.getenv('BEEBOT_STORAGE', 'json').lower()
+
+_backend = None
+
+
+class JsonBackend:
+    """Keeps every document in its own json file (resource_files/json_files/<name>.json)."""
+
+    def __init__(self, directory=json_files_directory):
+        self.directory = directory
+
+    def get_path(self, name):
+        return f'{self.directory}/{name}.json'
+
+    def load(self, name):
+        try:
+            with open(self.get_path(name), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def save(self, name, data):
+        files.atomic_write(self.get_path(name), json.dumps(data))
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if storage_backend == 'sqlite':
+            import cogs.helper.helper_functions.sqlite_backend as sqlite_backend
+            _backend = sqlite_backend.SqliteBackend()
+        else:
+            _backend = JsonBackend()
+    return _backend
@@ -0,0 +1,119 @@
+# *********************************************************************************************************************
+# track_queue.py
+# import cogs.helper.helper_functions.track_queue as track_queue
+# *********************************************************************************************************************
+
+import random
+import asyncio
+
+from collections import deque
+from itertools import islice
+
+
+def get_duration(track):
+    # songs (dicts or sources) without a known duration count as 0
+    try:
+        return track['duration'] or 0
+    except (KeyError, AttributeError):
+        return 0
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02}:{seconds:02}' if hours else f'{minutes}:{seconds:02}'
+
+
+# *********************************************************************************************************************
+# TrackQueue class
+# *********************************************************************************************************************
+class TrackQueue:
+    """Async queue of songs that can also be looked into and rearranged (indexes start at 0).
+    Adding and taking songs at either end is O(1), the total duration is kept up to date as songs come and go.
+    """
+
+    def __init__(self):
+        self._tracks = deque()
+        self._not_empty = asyncio.Event()
+        self.total_duration = 0
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def __iter__(self):
+        return iter(self._tracks)
+
+    def empty(self):
+        return not self._tracks
+
+    # *****************
+    # | adding songs |
+    # *****************
+    def put_nowait(self, track):
+        self._tracks.append(track)
+        self.total_duration += get_duration(track)
+        self._not_empty.set()
+
+    async def put(self, track):
+        # never full, async only to be a drop-in for asyncio.Queue
+        self.put_nowait(track)
+
+    def extend(self, tracks):
+        for track in tracks:
+            self.put_nowait(track)
+
+    # *****************
+    # | taking songs |
+    # *****************
+    def get_nowait(self):
+        if not self._tracks:
+            raise asyncio.QueueEmpty
+        track = self._tracks.popleft()
+        self.total_duration -= get_duration(track)
+        return track
+
+    async def get(self):
+        """Take the song at the head of the queue, waiting for one if the queue is empty."""
+        while not self._tracks:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self.get_nowait()
+
+    # ***************
+    # | looking in |
+    # ***************
+    def peek(self, index=0):
+        """The song at index, None if there isn't one."""
+        if not 0 <= index < len(self._tracks):
+            return None
+        return self._tracks[index]
+
+    def slice(self, start, stop):
+        return list(islice(self._tracks, start, stop))
+
+    # ****************
+    # | rearranging |
+    # ****************
+    def remove(self, index):
+        """Take out the song at index and return it (IndexError if there isn't one)."""
+        track = self._tracks[index]
+        del self._tracks[index]
+        self.total_duration -= get_duration(track)
+        return track
+
+    def move(self, index, new_index):
+        """Move the song at index to new_index (clamped to the queue) and return it."""
+        track = self._tracks[index]
+        del self._tracks[index]
+        self._tracks.insert(max(0, min(new_index, len(self._tracks))), track)
+        return track
+
+    def shuffle(self):
+        # shuffling a list then rebuilding the deque is O(n), deque indexing in the middle isn't O(1)
+        tracks = list(self._tracks)
+        random.shuffle(tracks)
+        self._tracks = deque(tracks)
+
+    def clear(self):
+        self._tracks.clear()
+        self.total_duration = 0
@@ -3,24 +3,19 @@
 # import cogs.helper.helper_functions.urls as urls
 # *********************************************************************************************************************
 
-import os
-import json
+import cogs.helper.helper_functions.document_store as document_store
 
-# get current directory
-current_directory = os.path.dirname(os.path.realpath(__file__))
-urls_json = "/".join(list(current_directory.split('/')
-                          [0:-3])) + '/resource_files/json_files/urls.json'
+# urls are read once and written back in batches (json file or sqlite, see storage_backends.py)
+urls_store = document_store.DocumentStore('urls')
 
 
 def get_urls_json():
-    with open(urls_json, "r") as f:
-        urls = json.load(f)
-    return urls
+    # returns the live in-memory urls, save changes with set_urls_json
+    return urls_store.get()
 
 
 def set_urls_json(data):
-    with open(urls_json, 'w') as outfile:
-        json.dump(data, outfile)
+    urls_store.set(data)
 
 
 def new_url(url_name, data):
@@ -0,0 +1,106 @@
+# *********************************************************************************************************************
+# ytdl_cache.py
+# import cogs.helper.helper_functions.ytdl_cache as ytdl_cache
+# *********************************************************************************************************************
+
+import time
+import asyncio
+
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+
+youtube_hosts = ('youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com')
+
+
+def normalize_query(query):
+    """Same song, same key: youtube links become 'youtube:<video id>', searches are lowercased and trimmed."""
+    query = query.strip()
+    parsed = urlparse(query)
+    if parsed.scheme in ('http', 'https'):
+        host = parsed.netloc.lower()
+        if host in youtube_hosts and parsed.path == '/watch' and 'v' in parse_qs(parsed.query):
+            return 'youtube:' + parse_qs(parsed.query)['v'][0]
+        if host == 'youtu.be' and parsed.path.strip('/'):
+            return 'youtube:' + parsed.path.strip('/')
+        return query
+    return ' '.join(query.lower().split())
+
+
+def split_queries(search):
+    # several songs in one request, separated by '|' or one per line
+    return [query.strip() for query in search.replace('\n', '|').split('|') if query.strip()]
+
+
+def is_playlist_url(query):
+    # only real playlist links, a song link that happens to be inside a playlist ('watch?v=...&list=...') plays the song
+    parsed = urlparse(query.strip())
+    return parsed.netloc.lower() in youtube_hosts and parsed.path == '/playlist' and 'list' in parse_qs(parsed.query)
+
+
+def get_entry_url(entry):
+    # flat playlist entries only carry the video id for youtube
+    url = entry.get('webpage_url') or entry.get('url') or ''
+    if not url.startswith(('http://', 'https://')) and entry.get('ie_key', 'Youtube') == 'Youtube':
+        return f"https://www.youtube.com/watch?v={entry.get('id') or url}"
+    return url
+
+
+# *********************************************************************************************************************
+# TtlCache class
+# *********************************************************************************************************************
+class TtlCache:
+    """Shared async cache of values that expire (least recently used entries are dropped past max_entries).
+    Concurrent lookups of the same missing key wait on one computation instead of each running their own.
+    Values are shared by every caller, so treat them as read-only.
+    """
+
+    def __init__(self, ttl, max_entries=512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # key -> (expires at, value)
+        self._entries = OrderedDict()
+        # key -> future of the computation in flight
+        self._pending = {}
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, value, expires_at=None):
+        if expires_at is None:
+            expires_at = time.time() + self.ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_create(self, key, create, expires_at=None):
+        """Cached value for key, otherwise the result of await create() (cached until expires_at(value) if given)."""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        pending = self._pending.get(key)
+        if pending is None:
+            self.misses += 1
+            pending = self._pending[key] = asyncio.ensure_future(self._create(key, create, expires_at))
+        else:
+            self.hits += 1
+        # one caller giving up (ex: cancelled command) doesn't cancel it for the others
+        return await asyncio.shield(pending)
+
+    async def _create(self, key, create, expires_at):
+        try:
+            value = await create()
+            self.put(key, value, expires_at(value) if expires_at is not None else None)
+            return value
+        finally:
+            self._pending.pop(key, None)
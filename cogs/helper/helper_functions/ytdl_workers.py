@@ -0,0 +1,145 @@
+# *********************************************************************************************************************
+# ytdl_workers.py
+# import cogs.helper.helper_functions.ytdl_workers as ytdl_workers
+# *********************************************************************************************************************
+
+import os
+import weakref
+import asyncio
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dotenv import load_dotenv
+from youtube_dl import YoutubeDL
+
+# number of extraction processes (set in .env)
+load_dotenv()
+ytdl_workers = int(os.getenv('BEEBOT_YTDL_WORKERS', '2'))
+# extractions a single guild can have running at once, the rest of its requests wait their turn
+# (half the workers, so one busy guild always leaves room for the others)
+guild_extraction_limit = max(1, ytdl_workers // 2)
+
+# song lookups, and a single separate worker for audio cache downloads (so downloads never take a lookup worker)
+_executor = None
+_download_executor = None
+_ytdl_options = {}
+# guild id -> semaphore bounding its extractions (dropped once no extraction of that guild holds it)
+_guild_slots = weakref.WeakValueDictionary()
+
+# the YoutubeDL instances (and their options) of the worker process this module is loaded in
+_worker_ytdl = None
+_worker_playlist_ytdl = None
+_worker_options = {}
+
+
+# *********************************************************************************************************************
+# worker process side
+# *********************************************************************************************************************
+def init_worker(options):
+    # every worker builds its YoutubeDL once and keeps it
+    global _worker_ytdl, _worker_playlist_ytdl, _worker_options
+    _worker_ytdl = YoutubeDL(options)
+    # only lists a playlist's entries (ids and titles), nothing is resolved
+    _worker_playlist_ytdl = YoutubeDL(dict(options, noplaylist=False, extract_flat='in_playlist'))
+    _worker_options = options
+
+
+def warm_worker():
+    return os.getpid()
+
+
+def extract_in_worker(url):
+    return _worker_ytdl.extract_info(url, download=False)
+
+
+def extract_playlist_in_worker(url):
+    return _worker_playlist_ytdl.extract_info(url, download=False)
+
+
+def download_in_worker(url, outtmpl):
+    # downloads get their own output template, returns where the file went and its audio codec
+    ytdl = YoutubeDL(dict(_worker_options, outtmpl=outtmpl))
+    info = ytdl.extract_info(url, download=True)
+    return ytdl.prepare_filename(info), info.get('acodec')
+
+
+# *********************************************************************************************************************
+# bot side
+# *********************************************************************************************************************
+def create_pool(workers):
+    # the bot has voice and image threads running, forking it could copy a held lock into the worker
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(_ytdl_options,),
+                               mp_context=multiprocessing.get_context('spawn'))
+
+
+def start_workers(options):
+    """Create the process pool and start every worker so the first song doesn't wait on a process spawn."""
+    global _executor, _ytdl_options
+    _ytdl_options = options
+    if _executor is None:
+        _executor = create_pool(ytdl_workers)
+        for _ in range(ytdl_workers):
+            _executor.submit(warm_worker)
+    return _executor
+
+
+def get_executor():
+    return start_workers(_ytdl_options)
+
+
+def get_download_executor():
+    # only started once the audio cache downloads its first song
+    global _download_executor
+    if _download_executor is None:
+        _download_executor = create_pool(1)
+    return _download_executor
+
+
+def restart_workers(broken_executor, get_pool):
+    # a worker died (ex: killed for memory), the pool can't be used anymore
+    # every call that was running on it ends up here, only the first one replaces it
+    global _executor, _download_executor
+    if _executor is broken_executor:
+        _executor = None
+        broken_executor.shutdown(wait=False)
+    elif _download_executor is broken_executor:
+        _download_executor = None
+        broken_executor.shutdown(wait=False)
+    return get_pool()
+
+
+def get_guild_slots(guild_id):
+    slots = _guild_slots.get(guild_id)
+    if slots is None:
+        slots = _guild_slots[guild_id] = asyncio.Semaphore(guild_extraction_limit)
+    return slots
+
+
+async def run_in_pool(get_pool, func, *args):
+    loop = asyncio.get_running_loop()
+    executor = get_pool()
+    try:
+        return await loop.run_in_executor(executor, func, *args)
+    except BrokenProcessPool:
+        return await loop.run_in_executor(restart_workers(executor, get_pool), func, *args)
+
+
+async def run_in_worker(guild_id, func, *args):
+    async with get_guild_slots(guild_id):
+        return await run_in_pool(get_executor, func, *args)
+
+
+async def extract_info(url, guild_id=None):
+    """ytdl.extract_info(url, download=False) run in a worker process, at most guild_extraction_limit per guild."""
+    return await run_in_worker(guild_id, extract_in_worker, url)
+
+
+async def extract_playlist(url, guild_id=None):
+    """Flat extraction of a playlist: one request for the list of entries, no per-song extraction."""
+    return await run_in_worker(guild_id, extract_playlist_in_worker, url)
+
+
+async def download(url, outtmpl):
+    """Download url in the download worker (one at a time), returns (file path, audio codec)."""
+    return await run_in_pool(get_download_executor, download_in_worker, url, outtmpl)
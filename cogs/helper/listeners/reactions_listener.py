@@ -3,61 +3,135 @@
 # *********************************************************************************************************************
 
 import cogs.helper.helper_functions.events as events
+import cogs.helper.helper_functions.attachment_cache as attachment_cache
 
+from discord import HTTPException, NotFound, Forbidden
+from discord.utils import snowflake_time
+from datetime import datetime
+from collections import OrderedDict
 from discord.ext.commands import Cog
 
+delete_emoji = '❌'
+# how many bot messages with a '❌' reaction are remembered
+deletable_messages_limit = 10000
+
 
 class Reactions(Cog):
     def __init__(self, bot):
         self.bot = bot
+        # message ids the bot put a '❌' reaction on, oldest first
+        self.deletable_messages = OrderedDict()
+        # older message ids already looked up on discord (deletable or not), so each is only fetched once
+        self.checked_messages = OrderedDict()
+        # messages from before this are the only ones that can be missing from the index
+        self.started_at = datetime.utcnow()
+
+    def is_giveaway(self, message_id):
+        return str(message_id) in events.get_events_json().get('giveaways', {})
+
+    def remember_deletable(self, message_id):
+        self.deletable_messages[message_id] = None
+        if len(self.deletable_messages) > deletable_messages_limit:
+            self.deletable_messages.popitem(last=False)
+
+    def remember_checked(self, message_id):
+        self.checked_messages[message_id] = None
+        if len(self.checked_messages) > deletable_messages_limit:
+            self.checked_messages.popitem(last=False)
+
+    async def fetch_deletable(self, channel, message_id):
+        # messages from before a restart aren't indexed, check them on discord once (bot message with the bot's '❌')
+        # newer messages are always indexed, so no http call for them
+        if snowflake_time(message_id) >= self.started_at or message_id in self.checked_messages:
+            return None
+        try:
+            message = await channel.fetch_message(message_id)
+        except (NotFound, Forbidden):
+            self.remember_checked(message_id)
+            return None
+        except HTTPException:
+            # discord hiccup, the next '❌' tries again
+            return None
+        self.remember_checked(message_id)
+        if message.author.id != self.bot.user.id:
+            return None
+        if not any(reaction.me and str(reaction.emoji) == delete_emoji for reaction in message.reactions):
+            return None
+        return message
 
     # *********************************************************************************************************************
     # listener for on_raw_reaction_add
     # *********************************************************************************************************************
     @Cog.listener()
     async def on_raw_reaction_add(self, payload):
-        message = await self.bot.get_channel(payload.channel_id).fetch_message(payload.message_id)
-        first_reaction_users = await message.reactions[0].users().flatten()
+        # only reactions on indexed messages go out to discord, everything else is dropped in memory
+        if payload.user_id == self.bot.user.id:
+            # remember the bot messages that can be deleted with '❌'
+            if payload.emoji.name == delete_emoji:
+                self.remember_deletable(payload.message_id)
+            return
+        if payload.member is not None and payload.member.bot:
+            return
 
         # ***********************************
         # | delete message on '❌' reaction |
         # ***********************************
-        for u in first_reaction_users:
-            if u.bot and len(first_reaction_users) > 1 and payload.emoji.name == '❌':
-                await message.delete()
-                break
+        if payload.emoji.name == delete_emoji:
+            channel = self.bot.get_channel(payload.channel_id)
+            if payload.message_id in self.deletable_messages:
+                self.deletable_messages.pop(payload.message_id)
+                message = channel.get_partial_message(payload.message_id)
+            else:
+                message = await self.fetch_deletable(channel, payload.message_id)
+            if message is not None:
+                try:
+                    return await message.delete()
+                except (NotFound, Forbidden):
+                    # already deleted, or the bot lost its permissions in that channel
+                    return
 
         # *********************************
         # | add participants to giveaways |
         # *********************************
-        if len(first_reaction_users) > 1:
-            events_data = events.get_events_json()
-            if 'giveaways' in events_data:
-                if str(payload.message_id) in events_data['giveaways']:
-                    giveaway = events_data['giveaways'][str(
-                        payload.message_id)]
-                    if payload.emoji.name == giveaway['reaction'] and not str(payload.member.id) in giveaway['participants']:
-                        giveaway['participants'][str(payload.member.id)] = str(
-                            payload.member.display_name)
-                        events.set_events_json(events_data)
+        if self.is_giveaway(payload.message_id):
+            async with events.transaction(events.giveaway_key(payload.message_id)) as events_data:
+                giveaway = events_data['giveaways'].get(str(payload.message_id))
+                if giveaway and payload.emoji.name == giveaway['reaction'] and not str(payload.member.id) in giveaway['participants']:
+                    giveaway['participants'][str(payload.member.id)] = str(
+                        payload.member.display_name)
 
     # *********************************************************************************************************************
     # listener for on_raw_reaction_remove
     # *********************************************************************************************************************
     @Cog.listener()
     async def on_raw_reaction_remove(self, payload):
-        message = await self.bot.get_channel(payload.channel_id).fetch_message(payload.message_id)
         # ************************************
         # | remove participants to giveaways |
         # ************************************
-        events_data = events.get_events_json()
-        if 'giveaways' in events_data:
-            if str(payload.message_id) in events_data['giveaways']:
-                giveaway = events_data['giveaways'][str(
-                    payload.message_id)]
-                if payload.emoji.name == giveaway['reaction'] and str(payload.user_id) in giveaway['participants']:
+        if self.is_giveaway(payload.message_id):
+            async with events.transaction(events.giveaway_key(payload.message_id)) as events_data:
+                giveaway = events_data['giveaways'].get(str(payload.message_id))
+                if giveaway and payload.emoji.name == giveaway['reaction'] and str(payload.user_id) in giveaway['participants']:
                     giveaway['participants'].pop(str(payload.user_id))
-                    events.set_events_json(events_data)
+
+    # *********************************************************************************************************************
+    # listener for on_raw_message_delete
+    # *********************************************************************************************************************
+    @Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        self.deletable_messages.pop(payload.message_id, None)
+        # cached cdn urls of images uploaded with this message are gone too
+        attachment_cache.forget_message(payload.message_id)
+
+    # *********************************************************************************************************************
+    # listener for on_raw_bulk_message_delete
+    # *********************************************************************************************************************
+    @Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        # purges only fire this event, not one on_raw_message_delete per message
+        for message_id in payload.message_ids:
+            self.deletable_messages.pop(message_id, None)
+            attachment_cache.forget_message(message_id)
 
 
 def setup(bot):
@@ -5,15 +5,21 @@
 
 import discord
 import asyncio
-import itertools
 import sys
+import time
+import threading
 import traceback
+import cogs.helper.helper_functions.ytdl_cache as ytdl_cache
+import cogs.helper.helper_functions.ytdl_workers as ytdl_workers
+import cogs.helper.helper_functions.audio_cache as audio_cache
+import cogs.helper.helper_functions.track_queue as track_queue
 
 from discord.ext import commands
 from discord import Embed
 from typing import Optional
 from async_timeout import timeout
 from functools import partial
+from urllib.parse import urlparse, parse_qs
 from youtube_dl import YoutubeDL
 
 # role specific names
@@ -41,6 +47,57 @@ ffmpegopts = {
 
 ytdl = YoutubeDL(ytdlopts)
 
+# stream urls without an expiry ('expire' parameter) are only trusted for this long (seconds)
+stream_url_ttl = 1800
+# re-resolve a prefetched stream url if it expires within this many seconds
+stream_url_expiry_margin = 60
+# how long a search/link keeps resolving to the same song (seconds)
+metadata_ttl = 6 * 3600
+metadata_fields = ('webpage_url', 'title', 'thumbnail', 'duration')
+# most songs queued from a single playlist / a single multi-song request
+playlist_max_songs = 500
+batch_max_songs = 25
+
+# search/link -> song metadata, webpage url -> ytdl info with its stream url (shared by every guild)
+metadata_cache = ytdl_cache.TtlCache(metadata_ttl)
+stream_cache = ytdl_cache.TtlCache(stream_url_ttl)
+
+
+def get_stream_expiry(url):
+    # youtube signs its stream urls with an 'expire' parameter (unix timestamp)
+    expiry = parse_qs(urlparse(url).query).get('expire')
+    if expiry:
+        try:
+            return int(expiry[0])
+        except ValueError:
+            pass
+    return time.time() + stream_url_ttl
+
+
+def get_stream_cache_expiry(info):
+    return info['stream_expires_at'] - stream_url_expiry_margin
+
+
+async def extract_info(url, *, guild_id=None):
+    # runs in the ytdl worker processes, off the event loop's GIL
+    info = await ytdl_workers.extract_info(url, guild_id)
+    if 'entries' in info:
+        # take first item from a playlist
+        info = info['entries'][0]
+    if info.get('url'):
+        info['stream_expires_at'] = get_stream_expiry(info['url'])
+        # the stream url came with it, keep it for when the song is played
+        stream_cache.put(info['webpage_url'], info, get_stream_cache_expiry(info))
+    return info
+
+
+async def get_metadata(search, *, guild_id=None):
+    """Song metadata for a search or link, cached and shared by identical requests in flight."""
+    async def extract():
+        info = await extract_info(search, guild_id=guild_id)
+        return {field: info.get(field) for field in metadata_fields}
+    return await metadata_cache.get_or_create(ytdl_cache.normalize_query(search), extract)
+
 
 class VoiceConnectionError(commands.CommandError):
     """Custom Exception class for connection errors."""
@@ -53,19 +110,91 @@ class InvalidVoiceChannel(VoiceConnectionError):
 # *********************************************************************************************************************
 # YTDLSource class
 # *********************************************************************************************************************
-class YTDLSource(discord.PCMVolumeTransformer):
+class YTDLSource(discord.AudioSource):
+    """Opus-native source: ffmpeg applies the volume and hands over opus packets (copied straight through when the
+    stream already is opus at 100% volume), so no frame is decoded to PCM or scaled in python.
+    Changing the volume restarts ffmpeg at the current position.
+    """
 
-    def __init__(self, source, *, data, requester):
-        super().__init__(source)
+    def __init__(self, url, *, data, requester, volume=1.0, start=0.0):
         self.requester = requester
+        self.url = url
 
         self.title = data.get('title')
         self.web_url = data.get('webpage_url')
         self.thumbnail = data.get('thumbnail')
+        self.duration = data.get('duration')
+        self.codec = data.get('acodec')
 
         # YTDL info dicts (data) have other useful information you might want
         # https://github.com/rg3/youtube-dl/blob/master/README.md
 
+        self._volume = volume
+        self._start = start
+        self._frames = 0
+        # the voice thread reads while the event loop may swap the ffmpeg process (volume change)
+        self._lock = threading.Lock()
+        self.original = self.create_ffmpeg_source(start)
+
+    def create_ffmpeg_source(self, start):
+        before_options = ffmpegopts['before_options']
+        if start:
+            before_options += f' -ss {start:.2f}'
+        options = ffmpegopts['options']
+        if self._volume == 1:
+            # FFmpegOpusAudio copies the stream as is when the codec is opus
+            codec = self.codec
+        else:
+            options += f' -filter:a volume={self._volume:.2f}'
+            codec = None
+        return discord.FFmpegOpusAudio(self.url, codec=codec, before_options=before_options, options=options)
+
+    @property
+    def position(self):
+        # seconds into the song, every packet read is one 20ms frame
+        return self._start + self._frames * discord.opus.Encoder.FRAME_LENGTH / 1000
+
+    @property
+    def volume(self):
+        return self._volume
+
+    @volume.setter
+    def volume(self, value):
+        if value == self._volume:
+            return
+        self._volume = value
+        self.restart()
+
+    def restart(self):
+        # ffmpeg is spawned outside the lock, only the swap is locked (a stalled read never blocks the event loop)
+        start = self.position
+        new = self.create_ffmpeg_source(start)
+        with self._lock:
+            old, self.original = self.original, new
+            self._start = start
+            self._frames = 0
+        old.cleanup()
+
+    def read(self):
+        # the pipe is read outside the lock, the voice thread can block on it without holding up restart()
+        while True:
+            with self._lock:
+                original = self.original
+            data = original.read()
+            with self._lock:
+                # the old ffmpeg was killed mid read by a restart, carry on with the new one
+                if not data and original is not self.original:
+                    continue
+                if data:
+                    self._frames += 1
+                return data
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        self.original.cleanup()
+
     def __getitem__(self, item: str):
         """Allows us to access attributes similar to a dict.
         This is only useful when you are NOT downloading.
@@ -76,12 +205,15 @@ class YTDLSource(discord.PCMVolumeTransformer):
     async def create_source(cls, ctx, search: str, *, loop, download=False):
         loop = loop or asyncio.get_event_loop()
 
-        to_run = partial(ytdl.extract_info, url=search, download=download)
-        data = await loop.run_in_executor(None, to_run)
+        if download:
+            to_run = partial(ytdl.extract_info, url=search, download=download)
+            data = await loop.run_in_executor(None, to_run)
 
-        if 'entries' in data:
-            # take first item from a playlist
-            data = data['entries'][0]
+            if 'entries' in data:
+                # take first item from a playlist
+                data = data['entries'][0]
+        else:
+            data = await get_metadata(search, guild_id=ctx.guild.id)
 
         # *********
         # | embed |
@@ -93,22 +225,99 @@ class YTDLSource(discord.PCMVolumeTransformer):
         if download:
             source = ytdl.prepare_filename(data)
         else:
-            return {'webpage_url': data['webpage_url'], 'requester': ctx.author, 'title': data['title'], 'thumbnail': data['thumbnail']}
+            return {'webpage_url': data['webpage_url'], 'requester': ctx.author, 'title': data['title'], 'thumbnail': data['thumbnail'],
+                    'duration': data.get('duration'), 'guild_id': ctx.guild.id}
+
+        return cls(source, data=data, requester=ctx.author)
+
+    @classmethod
+    async def create_playlist(cls, ctx, url: str):
+        """Placeholders for every song of a playlist, each one is only resolved once it nears the head of the queue
+        (prefetch_next / regather_stream), so a long playlist is playable after a single flat extraction."""
+        playlist = await ytdl_workers.extract_playlist(url, ctx.guild.id)
+        entries = [entry for entry in playlist.get('entries') or [] if entry][:playlist_max_songs]
+
+        # *********
+        # | embed |
+        # *********
+        embed = Embed(title=f"{playlist.get('title', 'Playlist')}\n🎶 Added {len(entries)} songs to Queue! 🎶",
+                      colour=ctx.author.colour)
+        await ctx.send(embed=embed, delete_after=15)
+
+        return [{'webpage_url': ytdl_cache.get_entry_url(entry), 'requester': ctx.author,
+                 'title': entry.get('title') or ytdl_cache.get_entry_url(entry),
+                 'thumbnail': entry.get('thumbnail'), 'duration': entry.get('duration'), 'guild_id': ctx.guild.id}
+                for entry in entries]
+
+    @classmethod
+    async def create_batch(cls, ctx, searches):
+        """Look up several songs at once, in the order given (failed lookups are left out).
+        The lookups run concurrently, ytdl_workers bounds how many of a guild's run at the same time."""
+        skipped = len(searches) - batch_max_songs
+        searches = searches[:batch_max_songs]
+        results = await asyncio.gather(*(get_metadata(search, guild_id=ctx.guild.id) for search in searches),
+                                       return_exceptions=True)
+        sources = []
+        added = []
+        failed = []
+        for search, data in zip(searches, results):
+            if isinstance(data, BaseException):
+                failed.append(search)
+                continue
+            sources.append({'webpage_url': data['webpage_url'], 'requester': ctx.author, 'title': data['title'],
+                            'thumbnail': data['thumbnail'], 'duration': data.get('duration'),
+                            'guild_id': ctx.guild.id})
+            added.append(f"{len(added) + 1}: {data['title']}")
+
+        # *********
+        # | embed |
+        # *********
+        embed = Embed(title=f"🎶 Added {len(sources)} songs to Queue! 🎶",
+                      colour=ctx.author.colour)
+        # embed fields
+        if added:
+            embed.add_field(name="🎵 Songs 🎵:", value='\n'.join(added)[:1024], inline=False)
+        if failed:
+            embed.add_field(name="Could not find:", value='\n'.join(failed)[:1024], inline=False)
+        if skipped > 0:
+            embed.set_footer(text=f"{skipped} more songs were skipped, a single request adds at most {batch_max_songs}")
+        await ctx.send(embed=embed, delete_after=15)
 
-        return cls(discord.FFmpegPCMAudio(source), data=data, requester=ctx.author)
+        return sources
 
     @classmethod
-    async def regather_stream(cls, data, *, loop):
+    async def resolve_stream(cls, data, *, loop):
+        """Resolve the stream url of a queued song, the result carries the time the url expires at.
+        Cached until shortly before the url expires."""
+        return await stream_cache.get_or_create(
+            data['webpage_url'], partial(extract_info, data['webpage_url'], guild_id=data.get('guild_id')),
+            expires_at=get_stream_cache_expiry)
+
+    @classmethod
+    async def regather_stream(cls, data, *, loop, volume=1.0):
         """Used for preparing a stream, instead of downloading.
-        Since Youtube Streaming links expire."""
-        loop = loop or asyncio.get_event_loop()
+        Since Youtube Streaming links expire.
+        Uses the url prefetched while the previous song played when it's still valid,
+        or the local copy when the song is in the audio cache."""
         requester = data['requester']
 
-        to_run = partial(ytdl.extract_info,
-                         url=data['webpage_url'], download=False)
-        data = await loop.run_in_executor(None, to_run)
+        track = audio_cache.get_track(data['webpage_url'])
+        if track is not None:
+            data.pop('prefetch', None)
+            return cls(track.path, data=dict(data, acodec=track.acodec), requester=requester, volume=volume)
+
+        info = None
+        prefetch = data.pop('prefetch', None)
+        if prefetch is not None:
+            try:
+                info = await prefetch
+            except Exception:
+                # resolve it again below, that error (if any) is the one reported
+                info = None
+        if info is None or info['stream_expires_at'] - stream_url_expiry_margin <= time.time():
+            info = await cls.resolve_stream(data, loop=loop)
 
-        return cls(discord.FFmpegPCMAudio(data['url']), data=data, requester=requester)
+        return cls(info['url'], data=info, requester=requester, volume=volume)
 
 
 # *********************************************************************************************************************
@@ -130,7 +339,7 @@ class MusicPlayer:
         self._channel = ctx.channel
         self._cog = ctx.cog
 
-        self.queue = asyncio.Queue()
+        self.queue = track_queue.TrackQueue()
         self.next = asyncio.Event()
 
         self.np = None  # Now playing message
@@ -157,7 +366,7 @@ class MusicPlayer:
                 # Source was probably a stream (not downloaded)
                 # So we should regather to prevent stream expiration
                 try:
-                    source = await YTDLSource.regather_stream(source, loop=self.bot.loop)
+                    source = await YTDLSource.regather_stream(source, loop=self.bot.loop, volume=self.volume)
                 except Exception as e:
                     await self._channel.send(f'There was an error processing your song.\n'
                                              f'```css\n[{e}]\n```')
@@ -168,6 +377,10 @@ class MusicPlayer:
 
             self._guild.voice_client.play(
                 source, after=lambda _: self.bot.loop.call_soon_threadsafe(self.next.set))
+            # resolve the next song while this one plays, so it can start without a gap
+            self.prefetch_next()
+            # often played songs get downloaded to the audio cache
+            audio_cache.record_play(source.web_url)
 
             # *********
             # | embed |
@@ -177,7 +390,8 @@ class MusicPlayer:
                           colour=discord.Colour.random())
             # embed thumbnail
             thumb_url = source.thumbnail
-            embed.set_thumbnail(url=thumb_url)
+            if thumb_url:
+                embed.set_thumbnail(url=thumb_url)
             self.np = await self._channel.send(embed=embed)
             await self.next.wait()
 
@@ -191,6 +405,20 @@ class MusicPlayer:
             except discord.HTTPException:
                 pass
 
+    def prefetch_next(self):
+        """Start resolving the stream url of the song at the head of the queue (if not already started)."""
+        entry = self.queue.peek()
+        if entry is None or isinstance(entry, YTDLSource) or 'prefetch' in entry:
+            return
+        if audio_cache.get_track(entry['webpage_url']) is not None:
+            # played from disk, nothing to resolve
+            return
+        entry['prefetch'] = self.bot.loop.create_task(
+            YTDLSource.resolve_stream(entry, loop=self.bot.loop))
+        # the error is reported when the song is played, don't warn about it being unretrieved
+        entry['prefetch'].add_done_callback(
+            lambda task: task.cancelled() or task.exception())
+
     def destroy(self, guild):
         """Disconnect and cleanup the player."""
         return self.bot.loop.create_task(self._cog.cleanup(guild))
@@ -207,6 +435,8 @@ class MusicModule(commands.Cog, name="MusicModule", description="BeeBot's Music
     def __init__(self, bot):
         self.bot = bot
         self.players = {}
+        # warm up the youtube_dl worker processes
+        ytdl_workers.start_workers(ytdlopts)
 
     # *********************************************************************************************************************
     # helper functions
@@ -296,7 +526,7 @@ class MusicModule(commands.Cog, name="MusicModule", description="BeeBot's Music
     # bot command to play music
     # *********************************************************************************************************************
     @commands.command(name='play', aliases=['sing', '▶️'],
-                      help='▶️ Plays YouTube audio! [Provide YouTube search or link, Role specific]')
+                      help='▶️ Plays YouTube audio! [Provide YouTube search or link, several separated by "|", Role specific]')
     # only specific roles can use this command
     @commands.has_role(role_specific_command_name)
     async def play_(self, ctx, *, search: Optional[str]):
@@ -307,6 +537,7 @@ class MusicModule(commands.Cog, name="MusicModule", description="BeeBot's Music
         # ------------
         # search: str [Required]
         #     The song to search and retrieve using YTDL. This could be a simple search, an ID or URL.
+        #     Several songs can be requested at once, separated by '|' or one per line.
         if search == None:
             await ctx.send('Please provide a YouTube link or YouTube search info! :pleading_face:')
         else:
@@ -319,9 +550,22 @@ class MusicModule(commands.Cog, name="MusicModule", description="BeeBot's Music
                     await ctx.invoke(self.connect_)
                 player = self.get_player(ctx)
                 # If download is False, source will be a dict which will be used later to regather the stream.
-                # If download is True, source will be a discord.FFmpegPCMAudio with a VolumeTransformer.
-                source = await YTDLSource.create_source(ctx, search, loop=self.bot.loop, download=False)
-                await player.queue.put(source)
+                # If download is True, source will be a YTDLSource (opus from ffmpeg).
+                queries = ytdl_cache.split_queries(search)
+                if ytdl_cache.is_playlist_url(search):
+                    # every song of the playlist goes in the queue straight away, resolved later on
+                    for source in await YTDLSource.create_playlist(ctx, search):
+                        await player.queue.put(source)
+                elif len(queries) > 1:
+                    # several songs (separated by '|' or one per line) are looked up together
+                    for source in await YTDLSource.create_batch(ctx, queries):
+                        await player.queue.put(source)
+                else:
+                    source = await YTDLSource.create_source(ctx, search, loop=self.bot.loop, download=False)
+                    await player.queue.put(source)
+                # a song is already playing, get this one ready if it's up next
+                if player.current:
+                    player.prefetch_next()
 
     # *********************************************************************************************************************
     # bot command to pause music
@@ -387,7 +631,7 @@ class MusicModule(commands.Cog, name="MusicModule", description="BeeBot's Music
         if not player.current:
             return await ctx.send('There is no audio in the queue! :flushed: Try the "play" command to add a song! :smile:')
         # Grab up to 5 entries from the queue...
-        upcoming = list(itertools.islice(player.queue._queue, 0, 5))
+        upcoming = player.queue.slice(0, 5)
         fmt = []
         if upcoming:
             count = 0
@@ -405,8 +649,70 @@ class MusicModule(commands.Cog, name="MusicModule", description="BeeBot's Music
         if fmt:
             embed.add_field(
                 name=f"🎶 Upcoming {len(upcoming)} Songs 🎶:", value='\n'.join(fmt), inline=False)
+        if len(player.queue) > len(upcoming):
+            embed.set_footer(text=f"{len(player.queue)} songs queued "
+                                  f"({track_queue.format_duration(player.queue.total_duration)})")
         await ctx.send(embed=embed)
 
+    # *********************************************************************************************************************
+    # bot command to remove a song from the queue
+    # *********************************************************************************************************************
+    @commands.command(name='remove', aliases=['dequeue'],
+                      help='Remove a song from the queue! [Position shown by the "queue" command] [Role specific]')
+    # only specific roles can use this command
+    @commands.has_role(role_specific_command_name)
+    async def remove_(self, ctx, position: int):
+        vc = ctx.voice_client
+        if not vc or not vc.is_connected():
+            return await ctx.send('Sorry! I\'m not currently connected to voice! :flushed:')
+        player = self.get_player(ctx)
+        if not 1 <= position <= len(player.queue):
+            return await ctx.send(f'Sorry! Please enter a position between 1 and {len(player.queue)}. :open_mouth:')
+        song = player.queue.remove(position - 1)
+        # a new song may be up next
+        if player.current:
+            player.prefetch_next()
+        await ctx.send(f'**{ctx.author.display_name}** removed **{song["title"]}** from the queue!', delete_after=15)
+
+    # *********************************************************************************************************************
+    # bot command to move a song in the queue
+    # *********************************************************************************************************************
+    @commands.command(name='move', aliases=['mv'],
+                      help='Move a song to another position in the queue! [Positions shown by the "queue" command] '
+                           '[Role specific]')
+    # only specific roles can use this command
+    @commands.has_role(role_specific_command_name)
+    async def move_(self, ctx, position: int, new_position: int):
+        vc = ctx.voice_client
+        if not vc or not vc.is_connected():
+            return await ctx.send('Sorry! I\'m not currently connected to voice! :flushed:')
+        player = self.get_player(ctx)
+        if not 1 <= position <= len(player.queue) or not 1 <= new_position <= len(player.queue):
+            return await ctx.send(f'Sorry! Please enter positions between 1 and {len(player.queue)}. :open_mouth:')
+        song = player.queue.move(position - 1, new_position - 1)
+        if player.current:
+            player.prefetch_next()
+        await ctx.send(f'**{ctx.author.display_name}** moved **{song["title"]}** to position {new_position}!',
+                       delete_after=15)
+
+    # *********************************************************************************************************************
+    # bot command to shuffle the queue
+    # *********************************************************************************************************************
+    @commands.command(name='shuffle', aliases=['🔀'], help='🔀 Shuffle the queue! [Role specific]')
+    # only specific roles can use this command
+    @commands.has_role(role_specific_command_name)
+    async def shuffle_(self, ctx):
+        vc = ctx.voice_client
+        if not vc or not vc.is_connected():
+            return await ctx.send('Sorry! I\'m not currently connected to voice! :flushed:')
+        player = self.get_player(ctx)
+        if player.queue.empty():
+            return await ctx.send('There is no audio in the queue! :flushed: Try the "play" command to add a song! :smile:')
+        player.queue.shuffle()
+        if player.current:
+            player.prefetch_next()
+        await ctx.send(f'**{ctx.author.display_name}** shuffled the queue! 🔀', delete_after=15)
+
     # *********************************************************************************************************************
     # bot command to view current audio
     # *********************************************************************************************************************
@@ -434,7 +740,8 @@ class MusicModule(commands.Cog, name="MusicModule", description="BeeBot's Music
                       colour=ctx.author.colour)
         # embed thumbnail
         thumb_url = vc.source.thumbnail
-        embed.set_thumbnail(url=thumb_url)
+        if thumb_url:
+            embed.set_thumbnail(url=thumb_url)
         player.np = await ctx.send(embed=embed)
 
     # *********************************************************************************************************************
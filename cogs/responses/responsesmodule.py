@@ -13,6 +13,8 @@ import discord
 import random
 import requests
 import json
+import cogs.helper.helper_functions.assets as assets
+import cogs.helper.helper_functions.attachment_cache as attachment_cache
 
 from discord.ext import commands
 from discord import Embed
@@ -24,8 +26,6 @@ from dotenv import load_dotenv
 load_dotenv()
 TENOR_KEY = os.getenv('TENOR_KEY')
 
-# get current directory
-current_directory = os.path.dirname(os.path.realpath(__file__))
 # role specific names
 role_specific_command_name = 'Bot Commander'
 admin_specific_command_name = 'Bot Admin'
@@ -37,40 +37,30 @@ class responsesmodule(commands.Cog, name="ResponsesModule",
                       description="angry, beefacts, coinflip, dadjoke, diceroll, gif, happy, happybirthday, pickcolour, sad"):
     def __init__(self, bot):
         self.bot = bot
+        # index the image folders and bee facts once, re-indexed when they change
+        assets.start_asset_refresh()
 
     # *********************************************************************************************************************
     # bot command to show bee facts
     # *********************************************************************************************************************
     @commands.command(name='beefacts', aliases=['bee', 'beefact', 'fact', 'facts', '🐝'], help='🐝 Bee facts!')
     async def bee_facts(self, ctx):
-        # get resources directory
-        resources_directory = "/".join(
-            list(current_directory.split('/')[0:-2])) + '/resource_files'
-        # get image directory
-        img_directory = resources_directory + '/image_files/bee_facts_images'
-        bee_facts_images = random.choice([
-            x for x in os.listdir(img_directory)
-            if os.path.isfile(os.path.join(img_directory, x))
-        ])
+        bee_facts_image = assets.random_image('bee_facts')
         # credits:
         # idea from https://github.com/SamKeathley/BeeBot
         # additional facts from https://www.sciencelearn.org.nz/resources/2002-bees-fun-facts
-        with open(resources_directory + '/text_files/bee_facts.txt', 'r') as file:
-            fact_quotes = file.readlines()
-            fact_message = random.choice(fact_quotes)
+        fact_message = assets.random_line('bee_facts')
         # *********
         # | embed |
         # *********
         embed = Embed(title=fact_message,
                       colour=discord.Colour.gold())
-        # embed image
-        file = discord.File(
-            f'resource_files/image_files/bee_facts_images/{bee_facts_images}', filename="image.gif")
-        embed.set_image(url='attachment://image.gif')
         # *************
         # | reactions |
         # *************
-        msg = await ctx.send(file=file, embed=embed)
+        # embed image (only uploaded the first time, then reused from discord's cdn)
+        msg = await attachment_cache.send_embed_with_file(
+            ctx, embed, bee_facts_image.upload_path, filename=bee_facts_image.upload_filename)
         await msg.add_reaction("🐝")
 
     # *********************************************************************************************************************
@@ -78,13 +68,7 @@ class responsesmodule(commands.Cog, name="ResponsesModule",
     # *********************************************************************************************************************
     @commands.command(name='happy', aliases=['c:', '😊'], help='😊 BeeBot happy! c:')
     async def happy(self, ctx):
-        # get happy_images directory
-        img_directory = "/".join(list(current_directory.split('/')
-                                 [0:-2])) + '/resource_files/image_files/happy_images'
-        happy_images = random.choice([
-            x for x in os.listdir(img_directory)
-            if os.path.isfile(os.path.join(img_directory, x))
-        ])
+        happy_image = assets.random_image('happy')
         happy_quotes = [
             'Smiley! :smile:',
             'I\'m a happy bee! :smile:',
@@ -96,14 +80,12 @@ class responsesmodule(commands.Cog, name="ResponsesModule",
         # *********
         embed = Embed(title=happy_message,
                       colour=discord.Colour.gold())
-        # embed image
-        file = discord.File(
-            f'resource_files/image_files/happy_images/{happy_images}', filename="image.gif")
-        embed.set_image(url='attachment://image.gif')
         # *************
         # | reactions |
         # *************
-        msg = await ctx.send(file=file, embed=embed)
+        # embed image (only uploaded the first time, then reused from discord's cdn)
+        msg = await attachment_cache.send_embed_with_file(
+            ctx, embed, happy_image.upload_path, filename=happy_image.upload_filename)
         await msg.add_reaction("😊")
 
     # *********************************************************************************************************************
@@ -111,13 +93,7 @@ class responsesmodule(commands.Cog, name="ResponsesModule",
     # *********************************************************************************************************************
     @commands.command(name='sad', aliases=['sadge', ':c', '😔'], help='😔 BeeBot sad! :c')
     async def sad(self, ctx):
-        # get sad_images directory
-        img_directory = "/".join(list(current_directory.split('/')
-                                 [0:-2])) + '/resource_files/image_files/sad_images'
-        sad_images = random.choice([
-            x for x in os.listdir(img_directory)
-            if os.path.isfile(os.path.join(img_directory, x))
-        ])
+        sad_image = assets.random_image('sad')
         sad_quotes = [
             'Big sad.',
             'Big sadge.',
@@ -131,14 +107,12 @@ class responsesmodule(commands.Cog, name="ResponsesModule",
         # *********
         embed = Embed(title=sad_message,
                       colour=discord.Colour.dark_blue())
-        # embed image
-        file = discord.File(
-            f'resource_files/image_files/sad_images/{sad_images}', filename="image.gif")
-        embed.set_image(url='attachment://image.gif')
         # *************
         # | reactions |
         # *************
-        msg = await ctx.send(file=file, embed=embed)
+        # embed image (only uploaded the first time, then reused from discord's cdn)
+        msg = await attachment_cache.send_embed_with_file(
+            ctx, embed, sad_image.upload_path, filename=sad_image.upload_filename)
         await msg.add_reaction("😔")
 
     # *********************************************************************************************************************
@@ -146,13 +120,7 @@ class responsesmodule(commands.Cog, name="ResponsesModule",
     # *********************************************************************************************************************
     @commands.command(name='angry', aliases=['angy', 'mad', 'hmph', '>:c', 'madge', '😡'], help='😡 BeeBot angry! >:c')
     async def angry(self, ctx):
-        # get angry_images directory
-        img_directory = "/".join(list(current_directory.split('/')
-                                 [0:-2])) + '/resource_files/image_files/angry_images'
-        angry_images = random.choice([
-            x for x in os.listdir(img_directory)
-            if os.path.isfile(os.path.join(img_directory, x))
-        ])
+        angry_image = assets.random_image('angry')
         angry_quotes = [
             'Do not talk me. Am anger.',
             'No talk me. Im angy.',
@@ -169,14 +137,12 @@ class responsesmodule(commands.Cog, name="ResponsesModule",
         # *********
         embed = Embed(title=angry_message,
                       colour=discord.Colour.red())
-        # embed image
-        file = discord.File(
-            f'resource_files/image_files/angry_images/{angry_images}', filename="image.gif")
-        embed.set_image(url='attachment://image.gif')
         # *************
         # | reactions |
         # *************
-        msg = await ctx.send(file=file, embed=embed)
+        # embed image (only uploaded the first time, then reused from discord's cdn)
+        msg = await attachment_cache.send_embed_with_file(
+            ctx, embed, angry_image.upload_path, filename=angry_image.upload_filename)
         await msg.add_reaction("😡")
 
     # *********************************************************************************************************************